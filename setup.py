@@ -38,6 +38,9 @@ setup(
         'aiohttp>=3.8.0',
         'python-dateutil>=2.8.0',
     ],
+    extras_require={
+        'speed': ['uvloop>=0.18.0; sys_platform != "win32"'],
+    },
     entry_points={
         'console_scripts': [
             'waybackpress=waybackpress.cli:main',
@@ -0,0 +1,80 @@
+"""
+Unit tests for WXR export writing.
+"""
+
+import io
+from datetime import datetime
+from pathlib import Path
+
+from lxml import etree
+
+from waybackpress.config import ProjectConfig
+from waybackpress.export import WXRExporter, NSMAP, CONTENT, WP
+
+
+def write_item(post_data):
+    """Write a single post item and return the parsed <item> element."""
+    exporter = WXRExporter(ProjectConfig(domain="example.com", output_dir=Path("/tmp")))
+    for cat in post_data.get('categories', []):
+        exporter.get_or_create_category(cat)
+    for tag in post_data.get('tags', []):
+        exporter.get_or_create_tag(tag)
+    
+    buffer = io.BytesIO()
+    with etree.xmlfile(buffer, encoding='UTF-8') as xf:
+        with xf.element('rss', nsmap=NSMAP):
+            exporter.write_post_item(xf, post_data)
+    return etree.fromstring(buffer.getvalue()).find('item')
+
+
+def test_write_post_item_cdata():
+    """Test that content and terms are written as real CDATA."""
+    item = write_item({
+        'post_id': 1,
+        'url': "https://example.com/my-post/",
+        'title': "My Post",
+        'date': datetime(2020, 1, 15, 10, 30),
+        'slug': "my-post",
+        'content': "<p>Hello & <b>world</b></p>",
+        'categories': ["News Items"],
+        'tags': ["Tips & Tricks"],
+    })
+    
+    assert item.find(CONTENT + 'encoded').text == "<p>Hello & <b>world</b></p>"
+    assert item.find(WP + 'post_date').text == "2020-01-15 10:30:00"
+    
+    terms = item.findall('category')
+    assert [t.text for t in terms] == ["News Items", "Tips & Tricks"]
+    assert terms[0].get('nicename') == "news-items"
+    assert terms[1].get('domain') == "post_tag"
+
+
+def test_write_post_item_cdata_terminator():
+    """Test that content containing ']]>' still round-trips."""
+    item = write_item({
+        'post_id': 2,
+        'url': "https://example.com/code/",
+        'title': "Code",
+        'date': datetime(2020, 1, 15),
+        'slug': "code",
+        'content': "<pre>a[b[0]]></pre>",
+    })
+    
+    assert item.find(CONTENT + 'encoded').text == "<pre>a[b[0]]></pre>"
+
+
+def test_dewrap_wayback_urls():
+    """Test that Wayback prefixes are stripped from the raw page."""
+    exporter = WXRExporter(ProjectConfig(domain="example.com", output_dir=Path("/tmp")))
+    html = (
+        b'<a href="https://web.archive.org/web/20200101000000/http://example.com/a/">a</a>'
+        b'<img srcset="http://web.archive.org/web/2020im_/https://example.com/1.jpg 1x, '
+        b'https://web.archive.org/web/2020im_/https://example.com/2.jpg 2x">'
+        b'<script src="https://web.archive.org/_static/js/wombat.js"></script>'
+    )
+    
+    assert exporter.dewrap_wayback_urls(html) == (
+        b'<a href="http://example.com/a/">a</a>'
+        b'<img srcset="https://example.com/1.jpg 1x, https://example.com/2.jpg 2x">'
+        b'<script src="https://web.archive.org/_static/js/wombat.js"></script>'
+    )
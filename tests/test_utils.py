@@ -8,6 +8,9 @@ from waybackpress.utils import (
     is_post_url,
     extract_slug_from_url,
     extract_date_from_url,
+    parse_flexible_date,
+    post_url_pattern,
+    compute_simhash,
 )
 
 
@@ -32,6 +35,21 @@ def test_is_post_url():
     assert not is_post_url("https://example.com/feed/", domain)
 
 
+def test_post_url_pattern():
+    """Test compiled post pattern against normalized URLs."""
+    pattern = post_url_pattern("www.example.com")
+    
+    assert pattern.match("example.com/2020/01/15/my-post")
+    assert pattern.match("example.com/my-post")
+    
+    assert not pattern.match("example.com")
+    assert not pattern.match("other.com/my-post")
+    assert not pattern.match("example.com/tag/news")
+    assert not pattern.match("example.com/page/2")
+    assert not pattern.match("example.com/2020/01")
+    assert not pattern.match("example.com/image.png")
+
+
 def test_extract_slug_from_url():
     """Test slug extraction from URLs."""
     assert extract_slug_from_url("https://example.com/2020/01/15/my-post/") == "my-post"
@@ -52,5 +70,28 @@ def test_extract_date_from_url():
     assert extract_date_from_url("https://example.com/my-post/") is None
 
 
+def test_parse_flexible_date():
+    """Test date parsing for ISO timestamps and free-form dates."""
+    from datetime import datetime
+    
+    assert parse_flexible_date("2020-01-15T10:30:00+05:00") == datetime(2020, 1, 15, 10, 30)
+    assert parse_flexible_date("2020-01-15 10:30:00.25Z") == datetime(2020, 1, 15, 10, 30, 0, 250000)
+    assert parse_flexible_date("2020-01-15") == datetime(2020, 1, 15)
+    assert parse_flexible_date("January 15, 2020") == datetime(2020, 1, 15)
+    assert parse_flexible_date("") is None
+
+
+def test_compute_simhash():
+    """Test that near-identical content gets a nearby fingerprint."""
+    words = [f"word{i}" for i in range(1000)]
+    text = " ".join(words)
+    edited = text.replace("word500 ", "Updated ", 1)
+    other = " ".join(reversed(words))
+    
+    assert compute_simhash(text) == compute_simhash(text.upper())
+    assert bin(compute_simhash(text) ^ compute_simhash(edited)).count("1") <= 3
+    assert bin(compute_simhash(text) ^ compute_simhash(other)).count("1") > 3
+
+
 # Add more tests as needed
 
@@ -10,14 +10,26 @@ from pathlib import Path
 
 from . import __version__
 from .config import init_project, load_project, setup_logging
-from .discover import discover_urls
-from .validate import validate_posts
-from .fetch import fetch_media
-from .export import export_wxr
+
+
+def run_async(coro):
+    """Run a coroutine to completion, on uvloop when it is installed."""
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(coro)
+    # uvloop.run() only exists from uvloop 0.18; older releases install
+    # their loop through the event loop policy instead
+    if getattr(uvloop, 'run', None) is None:
+        uvloop.install()
+        return asyncio.run(coro)
+    return uvloop.run(coro)
 
 
 def cmd_discover(args):
     """Discover URLs from Wayback Machine."""
+    from .discover import discover_urls
+    
     # Extract domain from URL if --url is provided
     single_url = args.url
     domain = args.domain
@@ -37,18 +49,18 @@ def cmd_discover(args):
     )
     
     logger = setup_logging(config, verbose=args.verbose)
-    logger.info(f"WaybackPress v{__version__}")
+    logger.info("WaybackPress v%s", __version__)
     
     if single_url:
-        logger.info(f"Extracting single URL: {single_url}")
-        count = asyncio.run(discover_urls(config, single_url=single_url))
+        logger.info("Extracting single URL: %s", single_url)
+        count = run_async(discover_urls(config, single_url=single_url))
     else:
-        logger.info(f"Discovering URLs for {domain}")
-        count = asyncio.run(discover_urls(config))
+        logger.info("Discovering URLs for %s", domain)
+        count = run_async(discover_urls(config))
     
     if count > 0:
-        logger.info(f"Success! Found {count} post URLs")
-        logger.info(f"Next step: waybackpress validate --output {config.output_dir}")
+        logger.info("Success! Found %s post URLs", count)
+        logger.info("Next step: waybackpress validate --output %s", config.output_dir)
         return config  # Return config for use in cmd_run
     else:
         logger.error("No posts found in Wayback Machine")
@@ -57,6 +69,8 @@ def cmd_discover(args):
 
 def cmd_validate(args):
     """Validate discovered URLs and extract metadata."""
+    from .validate import validate_posts
+    
     try:
         config = load_project(Path(args.output))
     except FileNotFoundError as e:
@@ -64,16 +78,16 @@ def cmd_validate(args):
         sys.exit(1)
     
     logger = setup_logging(config, verbose=args.verbose)
-    logger.info(f"Validating posts for {config.domain}")
+    logger.info("Validating posts for %s", config.domain)
     
-    count = asyncio.run(validate_posts(config))
+    count = run_async(validate_posts(config))
     
     if count > 0:
-        logger.info(f"Success! Found {count} valid posts")
+        logger.info("Success! Found %s valid posts", count)
         if not config.skip_media:
-            logger.info(f"Next step: waybackpress fetch-media --output {config.output_dir}")
+            logger.info("Next step: waybackpress fetch-media --output %s", config.output_dir)
         else:
-            logger.info(f"Next step: waybackpress export --output {config.output_dir}")
+            logger.info("Next step: waybackpress export --output %s", config.output_dir)
     else:
         logger.error("No valid posts found")
         sys.exit(1)
@@ -81,6 +95,8 @@ def cmd_validate(args):
 
 def cmd_fetch_media(args):
     """Fetch media assets from Wayback Machine."""
+    from .fetch import fetch_media
+    
     try:
         config = load_project(Path(args.output))
     except FileNotFoundError as e:
@@ -88,23 +104,25 @@ def cmd_fetch_media(args):
         sys.exit(1)
     
     logger = setup_logging(config, verbose=args.verbose)
-    logger.info(f"Fetching media for {config.domain} (pass {args.pass_number})")
+    logger.info("Fetching media for %s (pass %s)", config.domain, args.pass_number)
     
-    stats = asyncio.run(fetch_media(config, pass_number=args.pass_number))
+    stats = run_async(fetch_media(config, pass_number=args.pass_number))
     
     success_rate = stats['success'] / stats['total'] * 100 if stats['total'] > 0 else 0
     
-    logger.info(f"Fetch complete: {stats['success']}/{stats['total']} successful ({success_rate:.1f}%)")
+    logger.info("Fetch complete: %s/%s successful (%.1f%%)", stats['success'], stats['total'], success_rate)
     
     if stats['failed'] > 0 and success_rate < 80:
-        logger.info(f"Tip: Run another pass to retry failed downloads:")
-        logger.info(f"  waybackpress fetch-media --output {config.output_dir} --pass {args.pass_number + 1}")
+        logger.info("Tip: Run another pass to retry failed downloads:")
+        logger.info("  waybackpress fetch-media --output %s --pass %s", config.output_dir, args.pass_number + 1)
     else:
-        logger.info(f"Next step: waybackpress export --output {config.output_dir}")
+        logger.info("Next step: waybackpress export --output %s", config.output_dir)
 
 
 def cmd_export(args):
     """Export posts to WordPress WXR format."""
+    from .export import export_wxr
+    
     try:
         config = load_project(Path(args.output))
     except FileNotFoundError as e:
@@ -112,7 +130,7 @@ def cmd_export(args):
         sys.exit(1)
     
     logger = setup_logging(config, verbose=args.verbose)
-    logger.info(f"Exporting {config.domain} to WordPress WXR")
+    logger.info("Exporting %s to WordPress WXR", config.domain)
     
     wxr_path = export_wxr(
         config,
@@ -122,19 +140,19 @@ def cmd_export(args):
         author_email=args.author_email,
     )
     
-    logger.info(f"Export complete!")
-    logger.info(f"Import file: {wxr_path}")
-    logger.info(f"")
-    logger.info(f"To import into WordPress:")
-    logger.info(f"  1. Go to Tools → Import → WordPress")
-    logger.info(f"  2. Upload {wxr_path.name}")
-    logger.info(f"  3. Assign authors and import attachments")
+    logger.info("Export complete!")
+    logger.info("Import file: %s", wxr_path)
+    logger.info("")
+    logger.info("To import into WordPress:")
+    logger.info("  1. Go to Tools → Import → WordPress")
+    logger.info("  2. Upload %s", wxr_path.name)
+    logger.info("  3. Assign authors and import attachments")
     
     if not config.skip_media and config.media_fetched:
         media_dir = config.get_paths()['media']
-        logger.info(f"")
-        logger.info(f"Media files are in: {media_dir}")
-        logger.info(f"Upload these to your WordPress wp-content/uploads/ directory")
+        logger.info("")
+        logger.info("Media files are in: %s", media_dir)
+        logger.info("Upload these to your WordPress wp-content/uploads/ directory")
 
 
 def cmd_run(args):
@@ -171,7 +189,7 @@ def cmd_run(args):
     # Export
     logger.info("")
     logger.info("=" * 60)
-    logger.info(f"STEP {'4' if not args.skip_media else '3'}: Exporting to WXR")
+    logger.info("STEP %s: Exporting to WXR", '4' if not args.skip_media else '3')
     logger.info("=" * 60)
     cmd_export(args)
     
@@ -181,6 +199,63 @@ def cmd_run(args):
     logger.info("=" * 60)
 
 
+def _build_discover(parser):
+    """Add arguments for the discover command."""
+    parser.add_argument('domain', help='Domain to discover (e.g., example.com) or full URL for single post')
+    parser.add_argument('--url', help='Extract single URL instead of entire site (e.g., https://example.com/post-title/)')
+    parser.add_argument('--output', type=Path, help='Output directory')
+    parser.add_argument('--delay', type=float, default=5.0, help='Delay between requests (default: 5s)')
+    parser.add_argument('--concurrency', type=int, default=2, help='Concurrent requests (default: 2)')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
+
+
+def _build_validate(parser):
+    """Add arguments for the validate command."""
+    parser.add_argument('--output', type=Path, required=True, help='Project directory')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
+
+
+def _build_fetch_media(parser):
+    """Add arguments for the fetch-media command."""
+    parser.add_argument('--output', type=Path, required=True, help='Project directory')
+    parser.add_argument('--pass', dest='pass_number', type=int, default=1, help='Pass number (default: 1)')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
+
+
+def _build_export(parser):
+    """Add arguments for the export command."""
+    parser.add_argument('--output', type=Path, required=True, help='Project directory')
+    parser.add_argument('--title', help='Site title for export')
+    parser.add_argument('--url', help='Site URL for export')
+    parser.add_argument('--author-name', default='admin', help='Author name (default: admin)')
+    parser.add_argument('--author-email', default='admin@example.com', help='Author email')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
+
+
+def _build_run(parser):
+    """Add arguments for the run command (all-in-one)."""
+    parser.add_argument('domain', help='Domain to recover (e.g., example.com)')
+    parser.add_argument('--output', type=Path, help='Output directory')
+    parser.add_argument('--skip-media', action='store_true', help='Skip media fetching')
+    parser.add_argument('--delay', type=float, default=5.0, help='Delay between requests (default: 5s)')
+    parser.add_argument('--concurrency', type=int, default=2, help='Concurrent requests (default: 2)')
+    parser.add_argument('--title', help='Site title for export')
+    parser.add_argument('--url', help='Site URL for export')
+    parser.add_argument('--author-name', default='admin', help='Author name')
+    parser.add_argument('--author-email', default='admin@example.com', help='Author email')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
+
+
+# Command name -> (help text, argument builder)
+SUBPARSERS = {
+    'discover': ('Discover URLs from Wayback Machine', _build_discover),
+    'validate': ('Validate discovered URLs', _build_validate),
+    'fetch-media': ('Fetch media from Wayback Machine', _build_fetch_media),
+    'export': ('Export to WordPress WXR format', _build_export),
+    'run': ('Run complete recovery pipeline', _build_run),
+}
+
+
 def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(
@@ -219,49 +294,17 @@ Examples:
     
     subparsers = parser.add_subparsers(dest='command', help='Command to run')
     
-    # Discover command
-    discover_parser = subparsers.add_parser('discover', help='Discover URLs from Wayback Machine')
-    discover_parser.add_argument('domain', help='Domain to discover (e.g., example.com) or full URL for single post')
-    discover_parser.add_argument('--url', help='Extract single URL instead of entire site (e.g., https://example.com/post-title/)')
-    discover_parser.add_argument('--output', type=Path, help='Output directory')
-    discover_parser.add_argument('--delay', type=float, default=5.0, help='Delay between requests (default: 5s)')
-    discover_parser.add_argument('--concurrency', type=int, default=2, help='Concurrent requests (default: 2)')
-    discover_parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
-    
-    # Validate command
-    validate_parser = subparsers.add_parser('validate', help='Validate discovered URLs')
-    validate_parser.add_argument('--output', type=Path, required=True, help='Project directory')
-    validate_parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
-    
-    # Fetch media command
-    fetch_parser = subparsers.add_parser('fetch-media', help='Fetch media from Wayback Machine')
-    fetch_parser.add_argument('--output', type=Path, required=True, help='Project directory')
-    fetch_parser.add_argument('--pass', dest='pass_number', type=int, default=1, help='Pass number (default: 1)')
-    fetch_parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
-    
-    # Export command
-    export_parser = subparsers.add_parser('export', help='Export to WordPress WXR format')
-    export_parser.add_argument('--output', type=Path, required=True, help='Project directory')
-    export_parser.add_argument('--title', help='Site title for export')
-    export_parser.add_argument('--url', help='Site URL for export')
-    export_parser.add_argument('--author-name', default='admin', help='Author name (default: admin)')
-    export_parser.add_argument('--author-email', default='admin@example.com', help='Author email')
-    export_parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
-    
-    # Run command (all-in-one)
-    run_parser = subparsers.add_parser('run', help='Run complete recovery pipeline')
-    run_parser.add_argument('domain', help='Domain to recover (e.g., example.com)')
-    run_parser.add_argument('--output', type=Path, help='Output directory')
-    run_parser.add_argument('--skip-media', action='store_true', help='Skip media fetching')
-    run_parser.add_argument('--delay', type=float, default=5.0, help='Delay between requests (default: 5s)')
-    run_parser.add_argument('--concurrency', type=int, default=2, help='Concurrent requests (default: 2)')
-    run_parser.add_argument('--title', help='Site title for export')
-    run_parser.add_argument('--url', help='Site URL for export')
-    run_parser.add_argument('--author-name', default='admin', help='Author name')
-    run_parser.add_argument('--author-email', default='admin@example.com', help='Author email')
-    run_parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
-    
-    args = parser.parse_args()
+    # Every command is listed for --help, but only the one being invoked
+    # gets its arguments built
+    argv = sys.argv[1:]
+    selected = next((arg for arg in argv if not arg.startswith('-')), None)
+    
+    for name, (help_text, build) in SUBPARSERS.items():
+        subparser = subparsers.add_parser(name, help=help_text)
+        if name == selected:
+            build(subparser)
+    
+    args = parser.parse_args(argv)
     
     if not args.command:
         parser.print_help()
@@ -283,7 +326,7 @@ Examples:
         sys.exit(130)
     except Exception as e:
         logger = logging.getLogger('waybackpress')
-        logger.error(f"Fatal error: {e}")
+        logger.error("Fatal error: %s", e)
         if args.verbose:
             raise
         sys.exit(1)
@@ -4,12 +4,25 @@ Configuration and state management for WaybackPress.
 
 import json
 import logging
+import os
+import re
+import sys
 from pathlib import Path
-from typing import Optional, Dict, Any
-from dataclasses import dataclass, asdict
+from typing import Optional, Dict, Any, Tuple
+from dataclasses import dataclass, fields
 
 
-@dataclass
+# Leading protocol and www. stripped from user-supplied domains
+_DOMAIN_PREFIX_RE = re.compile(r'^(?:https?://)?(?:www\.)?')
+
+# Slotted instances where supported (dataclass slots need Python 3.10+)
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# Loaded configs keyed by (config path, mtime_ns), shared by load_project()
+_CONFIG_CACHE: Dict[Tuple[str, int], 'ProjectConfig'] = {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class ProjectConfig:
     """Project configuration and state."""
     
@@ -34,23 +47,31 @@ class ProjectConfig:
     @classmethod
     def load(cls, config_path: Path) -> 'ProjectConfig':
         """Load configuration from JSON file."""
-        with open(config_path, 'r') as f:
-            data = json.load(f)
-        
-        # Convert output_dir string to Path
-        if 'output_dir' in data:
-            data['output_dir'] = Path(data['output_dir'])
-        
+        # json accepts bytes directly, skipping the text-mode decode layer;
+        # __post_init__ converts the output_dir string to a Path
+        data = json.loads(Path(config_path).read_bytes())
         return cls(**data)
     
     def save(self, config_path: Path) -> None:
-        """Save configuration to JSON file."""
-        data = asdict(self)
+        """Save configuration to JSON file atomically."""
+        # Shallow field copy; asdict() would deep-copy every value
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
         # Convert Path to string for JSON serialization
         data['output_dir'] = str(self.output_dir)
         
-        with open(config_path, 'w') as f:
+        # Write to a sibling temp file and swap it in, so an interrupted
+        # save never leaves a truncated config behind
+        config_path = Path(config_path)
+        tmp_path = config_path.with_name(config_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
             json.dump(data, f, indent=2)
+        os.replace(tmp_path, config_path)
+        
+        # Replace any cached copy so the next load_project() sees this state
+        path_key = str(config_path)
+        for key in [k for k in _CONFIG_CACHE if k[0] == path_key]:
+            del _CONFIG_CACHE[key]
+        _CONFIG_CACHE[(path_key, config_path.stat().st_mtime_ns)] = self
     
     def get_paths(self) -> Dict[str, Path]:
         """Get all project paths."""
@@ -69,8 +90,9 @@ class ProjectConfig:
     def create_directories(self) -> None:
         """Create all necessary project directories."""
         paths = self.get_paths()
-        paths['root'].mkdir(parents=True, exist_ok=True)
-        paths['html'].mkdir(exist_ok=True)
+        # Creating the leaf directories with parents=True also creates the
+        # project root, so no separate mkdir is needed for it
+        paths['html'].mkdir(parents=True, exist_ok=True)
         if not self.skip_media:
             paths['media'].mkdir(exist_ok=True)
 
@@ -112,10 +134,7 @@ def setup_logging(config: ProjectConfig, verbose: bool = False) -> logging.Logge
 def init_project(domain: str, output_dir: Optional[Path] = None, **kwargs) -> ProjectConfig:
     """Initialize a new project with configuration."""
     # Normalize domain: strip protocol and www
-    import re
-    domain = re.sub(r'^https?://', '', domain)
-    domain = re.sub(r'^www\.', '', domain)
-    domain = domain.rstrip('/')
+    domain = _DOMAIN_PREFIX_RE.sub('', domain, count=1).rstrip('/')
     
     if output_dir is None:
         output_dir = Path.cwd() / 'wayback-data' / domain
@@ -136,12 +155,24 @@ def init_project(domain: str, output_dir: Optional[Path] = None, **kwargs) -> Pr
 
 
 def load_project(output_dir: Path) -> ProjectConfig:
-    """Load existing project configuration."""
+    """
+    Load existing project configuration.
+    
+    Repeated loads in one process return the cached instance until
+    config.json changes on disk.
+    """
     config_path = output_dir / 'config.json'
-    if not config_path.exists():
+    try:
+        mtime_ns = config_path.stat().st_mtime_ns
+    except FileNotFoundError:
         raise FileNotFoundError(
             f"No project found in {output_dir}. "
             f"Run 'discover' command first to initialize."
-        )
-    return ProjectConfig.load(config_path)
-
+        ) from None
+    
+    key = (str(config_path), mtime_ns)
+    config = _CONFIG_CACHE.get(key)
+    if config is None:
+        config = ProjectConfig.load(config_path)
+        _CONFIG_CACHE[key] = config
+    return config
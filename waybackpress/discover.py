@@ -4,16 +4,70 @@ URL discovery from Wayback Machine CDX API.
 
 import asyncio
 import logging
-from typing import Set, List
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Set, List, Tuple
 from pathlib import Path
 import aiohttp
+from yarl import URL
 
 from .config import ProjectConfig
-from .utils import normalize_url, is_post_url
+from .utils import (
+    normalize_url, post_url_pattern, compute_url_key, POST_REJECT_SEGMENTS
+)
 
 
 logger = logging.getLogger('waybackpress.discover')
 
+# Wayback CDX API endpoint; queries are built with properly escaped params
+CDX_BASE = URL('https://web.archive.org/cdx/search/cdx')
+
+# Bytes read from the CDX response per chunk while streaming
+CDX_CHUNK_SIZE = 1 << 16
+
+# CDX responses that signal rate limiting and are worth retrying
+RETRY_STATUSES = (429, 503)
+
+# Cheap pre-check run on the raw URL before normalization so archive pages
+# are rejected without running the full post pattern. Only the path is
+# searched (never the query or fragment), and only for the segments
+# post_url_pattern itself excludes, so it cannot drop a URL that pattern
+# would accept.
+_REJECT_RE = re.compile(
+    r'[^?#]*?(?:%s)' % '|'.join(re.escape(token) for token in POST_REJECT_SEGMENTS)
+)
+
+# URLs per batch handed to a worker process during post filtering
+FILTER_CHUNK_SIZE = 10_000
+
+# Chunks buffered between discovery pipeline stages
+PIPELINE_QUEUE_SIZE = 8
+
+
+def _filter_chunk(urls: List[str], domain: str) -> List[Tuple[str, str]]:
+    """
+    Filter a batch of URLs down to potential posts.
+    
+    Module-level so it can be pickled into worker processes.
+    
+    Args:
+        urls: URLs to filter
+        domain: Site domain
+        
+    Returns:
+        List of (url, normalized_url) pairs for post URLs, in input order
+    """
+    pattern = post_url_pattern(domain)
+    reject = _REJECT_RE.match
+    matches = []
+    for url in urls:
+        if reject(url):
+            continue
+        normalized = normalize_url(url)
+        if pattern.match(normalized):
+            matches.append((url, normalized))
+    return matches
+
 
 class URLDiscoverer:
     """Discovers URLs for a domain from Wayback Machine."""
@@ -22,148 +76,327 @@ class URLDiscoverer:
         self.config = config
         self.discovered_urls: Set[str] = set()
     
-    async def query_cdx(self, session: aiohttp.ClientSession) -> List[str]:
+    async def iter_cdx(self, session: aiohttp.ClientSession) -> AsyncIterator[str]:
         """
-        Query Wayback CDX API for all URLs from domain.
+        Stream all URLs for the domain from the Wayback CDX API.
+        
+        The response body is consumed line by line as it arrives, so large
+        domains never have the full CDX listing held in memory at once.
         
         Args:
             session: aiohttp session for requests
             
-        Returns:
-            List of discovered URLs
+        Yields:
+            Discovered URLs
+            
+        Raises:
+            aiohttp.ClientError, asyncio.TimeoutError: If the response fails
+                after URLs have already been yielded, so a truncated listing
+                is never mistaken for a complete one
         """
-        cdx_url = (
-            f"https://web.archive.org/cdx/search/cdx"
-            f"?url={self.config.domain}"
-            f"&matchType=domain"
-            f"&output=txt"
-            f"&fl=original"
-            f"&collapse=urlkey"
+        cdx_url = CDX_BASE.with_query(
+            url=self.config.domain,
+            matchType='domain',
+            output='txt',
+            fl='original',
+            collapse='urlkey',
         )
         
-        logger.info(f"Querying Wayback CDX API for {self.config.domain}")
-        logger.debug(f"CDX query: {cdx_url}")
+        logger.info("Querying Wayback CDX API for %s", self.config.domain)
+        logger.debug("CDX query: %s", cdx_url)
         
+        streamed = False
         try:
             async with session.get(cdx_url) as response:
                 if response.status != 200:
-                    logger.error(f"CDX API returned status {response.status}")
-                    return []
+                    logger.error("CDX API returned status %s", response.status)
+                    return
                 
-                text = await response.text()
-                urls = [line.strip() for line in text.split('\n') if line.strip()]
+                # Split large chunks with bytes.splitlines() rather than
+                # reading the body one readline() at a time; the partial
+                # trailing line is carried over to the next chunk
+                pending = b''
+                async for chunk in response.content.iter_chunked(CDX_CHUNK_SIZE):
+                    block, sep, pending = (pending + chunk).rpartition(b'\n')
+                    if not sep:
+                        continue
+                    for raw in block.splitlines():
+                        if raw:
+                            streamed = True
+                            yield raw.decode('utf-8', 'replace')
                 
-                logger.info(f"Found {len(urls)} unique URLs in Wayback Machine")
-                return urls
+                if pending.strip():
+                    yield pending.strip().decode('utf-8', 'replace')
         
         except Exception as e:
-            logger.error(f"Failed to query CDX API: {e}")
-            return []
+            if streamed:
+                logger.error("CDX stream failed part way through: %s", e)
+                raise
+            logger.error("Failed to query CDX API: %s", e)
+    
+    def save_urls(self, urls: List[str]) -> None:
+        """
+        Save discovered URLs to file.
+        
+        Args:
+            urls: List of URLs to save
+        """
+        output_file = self.config.get_paths()['discovered_urls']
+        
+        logger.info("Saving %s URLs to %s", len(urls), output_file)
+        
+        with open(output_file, 'w', buffering=1 << 20, newline='\n') as f:
+            f.write("url\n")
+            f.writelines(url + "\n" for url in sorted(urls))
+        
+        logger.info("Saved to %s", output_file)
     
-    def filter_post_urls(self, urls: List[str]) -> List[str]:
+    async def save_urls_async(self, urls: List[str]) -> None:
         """
-        Filter URLs to keep only potential posts.
+        Save discovered URLs to file without blocking the event loop.
+        
+        The write runs in the default thread pool so in-flight requests
+        keep being serviced while a large URL list is flushed to disk.
+        
+        Args:
+            urls: List of URLs to save
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.save_urls, urls)
+    
+    async def query_single_url(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        max_attempts: int = 5
+    ) -> bool:
+        """
+        Query CDX API to verify a single URL exists in Wayback Machine.
+        
+        Rate-limit responses (HTTP 429/503) are retried with exponential
+        back-off, capped at 60 seconds between attempts.
         
         Args:
-            urls: List of URLs to filter
+            session: aiohttp session for requests
+            url: URL to query
+            max_attempts: Maximum attempts when rate limited
             
         Returns:
-            List of filtered post URLs
+            True if URL found in Wayback, False otherwise
         """
-        logger.info("Filtering URLs to identify posts")
+        cdx_url = CDX_BASE.with_query(url=url, output='json', limit=1)
         
-        post_urls = []
-        for url in urls:
-            if is_post_url(url, self.config.domain):
-                post_urls.append(url)
+        logger.info("Querying Wayback Machine for: %s", url)
+        logger.debug("CDX query: %s", cdx_url)
         
-        logger.info(f"Identified {len(post_urls)} potential post URLs")
-        return post_urls
+        for attempt in range(max_attempts):
+            try:
+                async with session.get(cdx_url) as response:
+                    if response.status in RETRY_STATUSES:
+                        backoff = min(60, 2 ** attempt)
+                        logger.debug("CDX API returned %s, retrying in %ss", response.status, backoff)
+                        await asyncio.sleep(backoff)
+                        continue
+                    
+                    if response.status != 200:
+                        logger.error("CDX API returned status %s", response.status)
+                        return False
+                    
+                    text = await response.text()
+                    # CDX returns JSON array, first item is headers
+                    if text.strip() and text.count('[') > 0:
+                        logger.info("URL found in Wayback Machine")
+                        return True
+                    else:
+                        logger.warning("URL not found in Wayback Machine")
+                        return False
+            
+            except Exception as e:
+                logger.error("Failed to query CDX API: %s", e)
+                return False
+        
+        logger.error("CDX API still rate limiting after %s attempts: %s", max_attempts, url)
+        return False
+    
+    async def _bounded_query(
+        self,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        url: str
+    ) -> bool:
+        """Query a single URL while holding a concurrency slot."""
+        async with semaphore:
+            await asyncio.sleep(self.config.delay)
+            return await self.query_single_url(session, url)
     
-    def deduplicate_urls(self, urls: List[str]) -> List[str]:
+    async def _produce_cdx(
+        self,
+        session: aiohttp.ClientSession,
+        chunks: asyncio.Queue
+    ) -> int:
         """
-        Deduplicate URLs by normalizing and removing duplicates.
+        Pipeline stage 1: stream CDX URLs into chunks for filtering.
         
         Args:
-            urls: List of URLs to deduplicate
+            session: aiohttp session for requests
+            chunks: Queue receiving lists of up to FILTER_CHUNK_SIZE URLs,
+                followed by None once the stream ends
             
         Returns:
-            List of unique URLs
+            Total number of URLs streamed
+            
+        Raises:
+            Exception: Whatever iter_cdx raises when the stream breaks off.
+                No end marker is queued in that case, so a truncated listing
+                never reaches the later stages as a complete one
         """
-        logger.info("Deduplicating URLs")
-        
-        seen = set()
-        unique_urls = []
+        total = 0
+        chunk: List[str] = []
         
-        for url in urls:
-            normalized = normalize_url(url)
-            if normalized not in seen:
-                seen.add(normalized)
-                unique_urls.append(url)
+        async for url in self.iter_cdx(session):
+            total += 1
+            chunk.append(url)
+            if len(chunk) >= FILTER_CHUNK_SIZE:
+                await chunks.put(chunk)
+                chunk = []
         
-        removed = len(urls) - len(unique_urls)
-        if removed > 0:
-            logger.info(f"Removed {removed} duplicate URLs")
+        # Only reached once the whole listing has streamed
+        if chunk:
+            await chunks.put(chunk)
+        await chunks.put(None)
         
-        return unique_urls
+        return total
     
-    def save_urls(self, urls: List[str]) -> None:
+    async def _filter_chunks(self, chunks: asyncio.Queue, filtered: asyncio.Queue) -> None:
         """
-        Save discovered URLs to file.
+        Pipeline stage 2: filter URL chunks down to potential posts.
+        
+        Full chunks are dispatched to a process pool and their futures are
+        queued in order without waiting, so several chunks filter in
+        parallel while the CDX stream keeps downloading. A site whose
+        listing fits in a single partial chunk is filtered inline without
+        starting a pool.
         
         Args:
-            urls: List of URLs to save
+            chunks: Queue of URL chunks from _produce_cdx
+            filtered: Queue receiving futures of (url, normalized_url) pair
+                lists, followed by None
         """
-        output_file = self.config.get_paths()['discovered_urls']
+        loop = asyncio.get_running_loop()
+        pool = None
         
-        logger.info(f"Saving {len(urls)} URLs to {output_file}")
+        try:
+            while (chunk := await chunks.get()) is not None:
+                if pool is None and len(chunk) < FILTER_CHUNK_SIZE:
+                    # Only a short final chunk can be partial; if it is also
+                    # the first one, the whole listing is small
+                    future = loop.create_future()
+                    future.set_result(_filter_chunk(chunk, self.config.domain))
+                else:
+                    if pool is None:
+                        pool = ProcessPoolExecutor()
+                    future = loop.run_in_executor(
+                        pool, _filter_chunk, chunk, self.config.domain
+                    )
+                await filtered.put(future)
+        finally:
+            # Pending chunks still complete; the pool is released after them
+            if pool is not None:
+                pool.shutdown(wait=False)
         
-        with open(output_file, 'w') as f:
-            f.write("url\n")
-            for url in sorted(urls):
-                f.write(f"{url}\n")
+        await filtered.put(None)
+    
+    async def _deduplicate(self, filtered: asyncio.Queue) -> Tuple[int, List[str]]:
+        """
+        Pipeline stage 3: deduplicate filtered post URLs in stream order.
+        
+        The seen set is keyed by digest rather than the normalized string,
+        which keeps it small for domains with millions of URLs.
+        
+        Args:
+            filtered: Queue of filter futures from _filter_chunks
+            
+        Returns:
+            Tuple of (post URLs seen, unique post URLs)
+        """
+        post_count = 0
+        seen: Set[bytes] = set()
+        unique_urls: List[str] = []
         
-        logger.info(f"Saved to {output_file}")
+        while (future := await filtered.get()) is not None:
+            for url, normalized in await future:
+                post_count += 1
+                key = compute_url_key(normalized)
+                if key not in seen:
+                    seen.add(key)
+                    unique_urls.append(url)
+        
+        return post_count, unique_urls
     
-    async def query_single_url(self, session: aiohttp.ClientSession, url: str) -> bool:
+    async def discover_many(self, urls: List[str]) -> int:
         """
-        Query CDX API to verify a single URL exists in Wayback Machine.
+        Discover a batch of individual URLs from Wayback Machine.
+        
+        All lookups share one session and connection pool, and at most
+        config.concurrency queries are in flight at once.
         
         Args:
-            session: aiohttp session for requests
-            url: URL to query
+            urls: URLs to extract
             
         Returns:
-            True if URL found in Wayback, False otherwise
+            Number of URLs found and added
         """
-        cdx_url = (
-            f"https://web.archive.org/cdx/search/cdx"
-            f"?url={url}"
-            f"&output=json"
-            f"&limit=1"
+        logger.info("Starting extraction of %s URLs", len(urls))
+        
+        semaphore = asyncio.Semaphore(self.config.concurrency)
+        connector = aiohttp.TCPConnector(
+            limit_per_host=self.config.concurrency,
+            keepalive_timeout=30,
+            ttl_dns_cache=300,
         )
         
-        logger.info(f"Querying Wayback Machine for: {url}")
-        logger.debug(f"CDX query: {cdx_url}")
+        async with aiohttp.ClientSession(
+            headers={'User-Agent': self.config.user_agent},
+            connector=connector,
+        ) as session:
+            # Query CDX API for each URL
+            found = await asyncio.gather(
+                *[self._bounded_query(session, semaphore, url) for url in urls]
+            )
         
-        try:
-            async with session.get(cdx_url) as response:
-                if response.status != 200:
-                    logger.error(f"CDX API returned status {response.status}")
-                    return False
-                
-                text = await response.text()
-                # CDX returns JSON array, first item is headers
-                if text.strip() and text.count('[') > 0:
-                    logger.info(f"URL found in Wayback Machine")
-                    return True
-                else:
-                    logger.warning(f"URL not found in Wayback Machine")
-                    return False
+        found_urls = [url for url, ok in zip(urls, found) if ok]
+        for url, ok in zip(urls, found):
+            if not ok:
+                logger.error("URL not found in Wayback Machine: %s", url)
         
-        except Exception as e:
-            logger.error(f"Failed to query CDX API: {e}")
-            return False
+        if not found_urls:
+            return 0
+        
+        # Load existing URLs if file exists
+        existing_urls = set()
+        output_file = self.config.get_paths()['discovered_urls']
+        if output_file.exists():
+            try:
+                # Skip header
+                existing_urls = set(output_file.read_text().splitlines()[1:])
+                existing_urls.discard('')
+            except Exception as e:
+                logger.warning("Could not load existing URLs: %s", e)
+        
+        # Add new URLs
+        existing_urls.update(found_urls)
+        
+        # Save all URLs
+        await self.save_urls_async(list(existing_urls))
+        
+        # Update config
+        self.config.discovered = True
+        config_path = self.config.output_dir / 'config.json'
+        self.config.save(config_path)
+        
+        logger.info("URL extraction complete: %s/%s found", len(found_urls), len(urls))
+        
+        return len(found_urls)
     
     async def discover_single(self, url: str) -> int:
         """
@@ -175,46 +408,8 @@ class URLDiscoverer:
         Returns:
             Number of URLs discovered (0 or 1)
         """
-        logger.info(f"Starting single URL extraction for {url}")
-        
-        async with aiohttp.ClientSession(
-            headers={'User-Agent': self.config.user_agent}
-        ) as session:
-            # Query CDX API for this URL
-            found = await self.query_single_url(session, url)
-            
-            if not found:
-                logger.error(f"URL not found in Wayback Machine: {url}")
-                return 0
-            
-            # Load existing URLs if file exists
-            existing_urls = set()
-            output_file = self.config.get_paths()['discovered_urls']
-            if output_file.exists():
-                try:
-                    with open(output_file, 'r') as f:
-                        lines = f.readlines()
-                        # Skip header
-                        for line in lines[1:]:
-                            if line.strip():
-                                existing_urls.add(line.strip())
-                except Exception as e:
-                    logger.warning(f"Could not load existing URLs: {e}")
-            
-            # Add new URL
-            existing_urls.add(url)
-            
-            # Save all URLs
-            self.save_urls(list(existing_urls))
-            
-            # Update config
-            self.config.discovered = True
-            config_path = self.config.output_dir / 'config.json'
-            self.config.save(config_path)
-            
-            logger.info(f"Single URL extraction complete")
-            
-            return 1
+        logger.info("Starting single URL extraction for %s", url)
+        return await self.discover_many([url])
     
     async def discover(self) -> int:
         """
@@ -223,33 +418,51 @@ class URLDiscoverer:
         Returns:
             Number of URLs discovered
         """
-        logger.info(f"Starting URL discovery for {self.config.domain}")
+        logger.info("Starting URL discovery for %s", self.config.domain)
         
         async with aiohttp.ClientSession(
             headers={'User-Agent': self.config.user_agent}
         ) as session:
-            # Query CDX API
-            all_urls = await self.query_cdx(session)
+            # Stream, filter and deduplicate as overlapping pipeline stages
+            # so wall time tracks the slowest stage rather than their sum
+            logger.info("Filtering and deduplicating URLs as they stream")
+            chunks: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+            filtered: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+            tasks = [
+                asyncio.ensure_future(self._produce_cdx(session, chunks)),
+                asyncio.ensure_future(self._filter_chunks(chunks, filtered)),
+                asyncio.ensure_future(self._deduplicate(filtered)),
+            ]
+            try:
+                total, _, (post_count, unique_urls) = await asyncio.gather(*tasks)
+            except BaseException as e:
+                for task in tasks:
+                    task.cancel()
+                if isinstance(e, Exception):
+                    # Leave any previous discovery results and state untouched
+                    logger.error("Discovery aborted; no URLs were saved")
+                raise
             
-            if not all_urls:
+            if not total:
                 logger.warning("No URLs found in Wayback Machine")
                 return 0
             
-            # Filter for posts
-            post_urls = self.filter_post_urls(all_urls)
+            logger.info("Found %s unique URLs in Wayback Machine", total)
+            logger.info("Identified %s potential post URLs", post_count)
             
-            # Deduplicate
-            unique_urls = self.deduplicate_urls(post_urls)
+            removed = post_count - len(unique_urls)
+            if removed > 0:
+                logger.info("Removed %s duplicate URLs", removed)
             
             # Save results
-            self.save_urls(unique_urls)
+            await self.save_urls_async(unique_urls)
             
             # Update config
             self.config.discovered = True
             config_path = self.config.output_dir / 'config.json'
             self.config.save(config_path)
             
-            logger.info(f"Discovery complete: {len(unique_urls)} post URLs found")
+            logger.info("Discovery complete: %s post URLs found", len(unique_urls))
             
             return len(unique_urls)
 
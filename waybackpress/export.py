@@ -2,18 +2,22 @@
 WordPress WXR 1.2 export generation.
 """
 
+import copy
+import csv
 import logging
+import pickle
 import re
 import sys
-import xml.etree.ElementTree as ET
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from email.utils import format_datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Set
-from xml.dom import minidom
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
-import trafilatura
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 
 from .config import ProjectConfig
 from .utils import parse_flexible_date, extract_date_from_url, extract_slug_from_url
@@ -21,6 +25,189 @@ from .utils import parse_flexible_date, extract_date_from_url, extract_slug_from
 
 logger = logging.getLogger('waybackpress.export')
 
+# WXR namespaces
+CONTENT_NS = 'http://purl.org/rss/1.0/modules/content/'
+WP_NS = 'http://wordpress.org/export/1.2/'
+DC_NS = 'http://purl.org/dc/elements/1.1/'
+EXCERPT_NS = 'http://wordpress.org/export/1.2/excerpt/'
+
+NSMAP = {
+    'content': CONTENT_NS,
+    'wp': WP_NS,
+    'dc': DC_NS,
+    'excerpt': EXCERPT_NS,
+}
+
+# Qualified tag prefixes, e.g. WP + 'post_id'
+CONTENT = f'{{{CONTENT_NS}}}'
+WP = f'{{{WP_NS}}}'
+DC = f'{{{DC_NS}}}'
+EXCERPT = f'{{{EXCERPT_NS}}}'
+
+# Posts sent to each export worker per batch
+EXPORT_CHUNK_SIZE = 16
+
+# Indentation unit for the streamed WXR document
+INDENT = '  '
+
+# Newline plus indentation per nesting depth, built once for the writer
+_LINE_BREAKS = tuple('\n' + INDENT * depth for depth in range(4))
+
+# Markers identifying Wayback UI elements by id / class
+_CHROME_ID_RE = re.compile(r'wombat|wayback|iconochive|replay|donato', re.IGNORECASE)
+_CHROME_CLASS_RE = re.compile(r'wombat|wayback|iconochive|replay', re.IGNORECASE)
+
+# Lazy-loading attributes holding the real image URL, in priority order
+LAZY_SRC_ATTRS = ('data-lazy-src', 'data-src', 'data-lazy-original', 'data-original')
+LAZY_SRCSET_ATTRS = ('data-lazy-srcset', 'data-srcset')
+
+# Whitespace runs replaced with '-' in term slugs
+_SLUG_RE = re.compile(r'\s+')
+
+# Trailing " | Site Name" style suffix on page titles
+_TITLE_SUFFIX_RE = re.compile(r'\s*[|\-–]\s*.*$')
+
+# Wayback prefix in front of an original URL, matched in raw page bytes
+_WAYBACK_PREFIX_RE = re.compile(rb'https?://web\.archive\.org/web/\d+[a-z_]*/(?=https?://)')
+
+# Archived pages are read as bytes and decoded as UTF-8 by libxml2. Comments
+# and PIs are dropped as trafilatura's own parser would, since the parsed
+# tree is handed to it directly
+_HTML_PARSER = lxml.html.HTMLParser(
+    encoding='utf-8',
+    remove_comments=True,
+    remove_pis=True,
+    collect_ids=False,
+)
+
+
+def _has_class(name: str) -> str:
+    """XPath predicate equivalent to the CSS class selector '.name'."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _text_content(elem: lxml.html.HtmlElement) -> str:
+    """Concatenate the stripped text nodes under an element."""
+    return ''.join(text.strip() for text in elem.itertext())
+
+
+def _has_text(elem: lxml.html.HtmlElement) -> bool:
+    """Whether any text under an element is non-blank, stopping at the first."""
+    return any(text.strip() for text in elem.itertext())
+
+
+def _collapse_blank_text(root: lxml.html.HtmlElement) -> None:
+    """
+    Collapse whitespace-only text to a single newline or space.
+    
+    Keeps extracted content identical to what BeautifulSoup produced, which
+    drops indentation between elements outside <pre> and <textarea>.
+    """
+    preserved = set()
+    for elem in root.iter('pre', 'textarea'):
+        preserved.update(elem.iter())
+    
+    for elem in root.iter():
+        if elem.text and not elem.text.strip() and elem not in preserved:
+            elem.text = '\n' if '\n' in elem.text else ' '
+        if elem.tail and not elem.tail.strip() and elem.getparent() not in preserved:
+            elem.tail = '\n' if '\n' in elem.tail else ' '
+
+
+# Compiled once and reused for every post
+TITLE_SELECTORS = tuple(etree.XPath(expr) for expr in (
+    f"//h1[{_has_class('entry-title')}]",
+    f"//h1[{_has_class('post-title')}]",
+    f"//*[{_has_class('entry-title')}]",
+    f"//*[{_has_class('post-title')}]",
+    "//h1",
+))
+
+DATE_SELECTORS = tuple(etree.XPath(expr) for expr in (
+    "//time[@datetime]",
+    f"//*[{_has_class('entry-date')}]",
+    f"//*[{_has_class('post-date')}]",
+    f"//*[{_has_class('published')}]",
+))
+
+CONTENT_SELECTORS = tuple(etree.XPath(expr) for expr in (
+    f"//*[{_has_class('entry-content')}]",
+    f"//*[{_has_class('post-content')}]",
+    f"//article//*[{_has_class('content')}]",
+    f"//*[{_has_class('single-content')}]",
+    "//article",
+))
+
+# Every id / class value in the page; results are smart strings whose
+# getparent() is the owning element, so no per-element proxies are built
+ID_VALUES = etree.XPath('//@id')
+CLASS_VALUES = etree.XPath('//@class')
+
+# Links that may point at a category or tag archive
+TAXONOMY_LINKS = etree.XPath('//a[@href and @rel]')
+
+# Images whose src is a lazy-loading placeholder
+LAZY_IMAGES = etree.XPath(
+    "//img[contains(@src, 'data:image/svg+xml') or starts-with(@src, 'data:image/svg')]"
+)
+
+# Boilerplate stripped from fallback content, as a single union expression
+REMOVE_SELECTOR = etree.XPath(' | '.join(
+    f"descendant-or-self::{step}" for step in (
+        "script", "style", "noscript",
+        f"*[{_has_class('post-title')}]", f"*[{_has_class('entry-title')}]",
+        f"*[{_has_class('entry-meta')}]", f"*[{_has_class('post-meta')}]", f"*[{_has_class('date')}]",
+        "*[@id='comments']", f"*[{_has_class('comments')}]",
+        f"*[{_has_class('sharedaddy')}]", f"*[{_has_class('sd-sharing')}]",
+        f"*[{_has_class('post-navigation')}]",
+        "nav", "aside", "header", "footer",
+    )
+))
+
+
+def _cdata(text: str):
+    """
+    Wrap text for output as a CDATA section.
+    
+    CDATA cannot contain ']]>', so such text is returned as-is and written
+    as ordinary escaped character data, which parses to the same string.
+    """
+    if ']]>' in text:
+        return text
+    return etree.CDATA(text)
+
+
+def _write_element(
+    xf: etree.xmlfile,
+    tag: str,
+    text=None,
+    depth: int = 2,
+    attrib: Optional[Dict[str, str]] = None,
+) -> None:
+    """
+    Write a leaf element on its own indented line.
+    
+    text may be a plain string or a CDATA section from _cdata().
+    """
+    xf.write(_LINE_BREAKS[depth])
+    with xf.element(tag, attrib or {}):
+        if text:
+            xf.write(text)
+
+
+@contextmanager
+def _open_element(
+    xf: etree.xmlfile,
+    tag: str,
+    depth: int = 2,
+    attrib: Optional[Dict[str, str]] = None,
+):
+    """Open an element on its own indented line, closing it likewise."""
+    xf.write(_LINE_BREAKS[depth])
+    with xf.element(tag, attrib or {}):
+        yield
+        xf.write(_LINE_BREAKS[depth])
+
 
 class WXRExporter:
     """Generates WordPress WXR 1.2 import file."""
@@ -34,13 +221,18 @@ class WXRExporter:
         author_email: str = "admin@example.com",
     ):
         self.config = config
+        self.paths = config.get_paths()
         self.site_title = site_title
         self.site_url = site_url
         self.author_name = author_name
         self.author_email = author_email
         
-        self.categories: Dict[str, int] = {}
-        self.tags: Dict[str, int] = {}
+        # Term name -> (term ID, slug), slugified once on registration
+        self.categories: Dict[str, Tuple[int, str]] = {}
+        self.tags: Dict[str, Tuple[int, str]] = {}
+        # Per-term <category> attributes, shared by every item using the term
+        self._cat_attrib: Dict[str, Dict[str, str]] = {}
+        self._tag_attrib: Dict[str, Dict[str, str]] = {}
         self.next_term_id = 1
         self.next_post_id = 1
         
@@ -52,55 +244,64 @@ class WXRExporter:
     
     def load_valid_posts(self) -> List[Dict[str, str]]:
         """Load validated posts."""
-        posts_file = self.config.get_paths()['valid_posts']
+        posts_file = self.paths['valid_posts']
         
         if not posts_file.exists():
             raise FileNotFoundError(
                 "No valid posts found. Run 'validate' command first."
             )
         
+        # Kept as a list: the total drives progress logging, and the process
+        # pool submits every post up front anyway
         posts = []
-        with open(posts_file, 'r') as f:
-            next(f)  # Skip header
-            for line in f:
-                if line.strip():
-                    parts = line.strip().split('\t')
-                    url = parts[0]
-                    local_path = parts[1]
-                    post_type = parts[2] if len(parts) > 2 else 'post'
+        with open(posts_file, 'r', newline='') as f:
+            reader = csv.reader(f, delimiter='\t', quoting=csv.QUOTE_NONE)
+            next(reader, None)  # Skip header
+            for row in reader:
+                if row:
                     posts.append({
-                        'url': url,
-                        'local_path': local_path,
-                        'post_type': post_type
+                        'url': row[0],
+                        'local_path': row[1],
+                        'post_type': row[2] if len(row) > 2 else 'post'
                     })
         
         logger.info(f"Loaded {len(posts)} posts to export")
         return posts
     
-    def strip_wayback_chrome(self, soup: BeautifulSoup) -> None:
-        """Remove Wayback Machine UI elements."""
-        to_remove = []
+    def dewrap_wayback_urls(self, html: bytes) -> bytes:
+        """
+        Rewrite Wayback URLs to original URLs in the raw page.
         
-        for tag in soup.find_all():
-            if tag is None:
-                continue
-            
-            tag_id = str(tag.get('id', '')).lower()
-            if any(x in tag_id for x in ['wombat', 'wayback', 'iconochive', 'replay', 'donato']):
-                to_remove.append(tag)
-                continue
-            
-            tag_class = ' '.join(tag.get('class', [])).lower()
-            if any(x in tag_class for x in ['wombat', 'wayback', 'iconochive', 'replay']):
-                to_remove.append(tag)
+        The rewrite is purely textual, so it runs as one regex pass over the
+        file contents before parsing instead of per attribute in the tree.
+        """
+        return _WAYBACK_PREFIX_RE.sub(b'', html)
+    
+    def clean_wayback_markup(self, doc: lxml.html.HtmlElement) -> None:
+        """
+        Undo Wayback Machine changes to the parsed page.
         
+        Lazy-loaded images get their real URL promoted to src and Wayback UI
+        elements (toolbar, replay scripts) are removed. URLs must already be
+        dewrapped so the promoted src is the original URL.
+        
+        Candidates are selected by compiled XPath in libxml2: only id/class
+        values and placeholder images reach Python, not every element.
+        """
+        for img in LAZY_IMAGES(doc):
+            self.normalize_lazy_image(img)
+        
+        to_remove = [value.getparent() for value in ID_VALUES(doc) if _CHROME_ID_RE.search(value)]
+        to_remove += [value.getparent() for value in CLASS_VALUES(doc) if _CHROME_CLASS_RE.search(value)]
+        
+        # drop_tree() keeps the text following the removed element
         for tag in to_remove:
-            if tag and tag.parent:
-                tag.decompose()
+            if tag.getparent() is not None:
+                tag.drop_tree()
     
-    def normalize_lazy_images(self, soup: BeautifulSoup) -> None:
+    def normalize_lazy_image(self, img: lxml.html.HtmlElement) -> None:
         """
-        Normalize lazy-loaded images by promoting data-lazy-src to src.
+        Normalize a lazy-loaded image by promoting data-lazy-src to src.
         
         Many WordPress sites use lazy-loading plugins (Jetpack, WP Rocket, etc.)
         that put placeholder SVGs in src and real URLs in data-lazy-src.
@@ -108,122 +309,102 @@ class WXRExporter:
         JavaScript doesn't run.
         
         This function fixes them by:
-        1. Finding images with placeholder src (data:image/svg+xml)
+        1. Detecting a placeholder src (data:image/svg+xml)
         2. Copying data-lazy-src (or data-src, data-original) to src
         3. Removing lazy-loading attributes
         """
-        for img in soup.find_all('img'):
-            src = img.get('src', '')
+        src = img.get('src', '')
+        
+        # Check if this is a lazy-loaded placeholder
+        if 'data:image/svg+xml' in src or src.startswith('data:image/svg'):
+            # Look for real image URL in lazy-loading attributes
+            real_url = None
             
-            # Check if this is a lazy-loaded placeholder
-            if 'data:image/svg+xml' in src or src.startswith('data:image/svg'):
-                # Look for real image URL in lazy-loading attributes
-                real_url = None
-                lazy_attrs = ['data-lazy-src', 'data-src', 'data-lazy-original', 'data-original']
-                
-                for attr in lazy_attrs:
-                    if img.has_attr(attr):
-                        real_url = img[attr]
-                        break
+            for attr in LAZY_SRC_ATTRS:
+                if attr in img.attrib:
+                    real_url = img.get(attr)
+                    break
+            
+            if real_url:
+                # Promote lazy URL to src
+                img.set('src', real_url)
                 
-                if real_url:
-                    # Promote lazy URL to src
-                    img['src'] = real_url
-                    
-                    # Remove all lazy-loading attributes
-                    for attr in lazy_attrs + ['data-lazy-srcset', 'data-srcset']:
-                        if img.has_attr(attr):
-                            del img[attr]
+                # Remove all lazy-loading attributes
+                for attr in LAZY_SRC_ATTRS + LAZY_SRCSET_ATTRS:
+                    img.attrib.pop(attr, None)
     
-    def dewrap_wayback_urls(self, soup: BeautifulSoup) -> None:
-        """Rewrite Wayback URLs to original URLs."""
-        pattern = re.compile(r'https?://web\.archive\.org/web/\d+[a-z_]*/(https?://[^"\s]+)')
-        
-        # Handle standard and lazy-loading attributes
-        attrs_to_check = ['href', 'src', 'srcset', 'data-src', 'data-lazy-src', 'data-original', 'data-lazy-original']
-        
-        for attr in attrs_to_check:
-            for tag in soup.find_all(attrs={attr: True}):
-                if tag.has_attr(attr):
-                    value = tag[attr]
-                    tag[attr] = pattern.sub(r'\1', value)
-    
-    def extract_title(self, soup: BeautifulSoup) -> str:
+    def extract_title(self, doc: lxml.html.HtmlElement) -> str:
         """Extract post title."""
         # Try common selectors
-        selectors = [
-            'h1.entry-title',
-            'h1.post-title',
-            '.entry-title',
-            '.post-title',
-            'h1',
-        ]
-        
-        for selector in selectors:
-            elem = soup.select_one(selector)
-            if elem:
-                title = elem.get_text(strip=True)
+        for selector in TITLE_SELECTORS:
+            found = selector(doc)
+            if found:
+                title = _text_content(found[0])
                 # Remove site name
-                title = re.sub(r'\s*[|\-–]\s*.*$', '', title)
+                title = _TITLE_SUFFIX_RE.sub('', title)
                 if title and len(title) > 3:
                     return title
         
         # Fallback to <title>
-        title_tag = soup.find('title')
-        if title_tag:
-            title = title_tag.get_text(strip=True)
-            title = re.sub(r'\s*[|\-–]\s*.*$', '', title)
+        title_tag = doc.find('.//title')
+        if title_tag is not None:
+            title = _text_content(title_tag)
+            title = _TITLE_SUFFIX_RE.sub('', title)
             if title:
                 return title
         
         return "Untitled Post"
     
-    def extract_date(self, soup: BeautifulSoup, url: str) -> datetime:
+    def extract_date(self, doc: lxml.html.HtmlElement, url: str) -> datetime:
         """Extract post date."""
         # Try URL first
         url_date = extract_date_from_url(url)
         
         # Try DOM selectors
-        date_selectors = [
-            'time[datetime]',
-            '.entry-date',
-            '.post-date',
-            '.published',
-        ]
-        
-        for selector in date_selectors:
-            elem = soup.select_one(selector)
-            if elem:
-                date_str = elem.get('datetime') or elem.get_text(strip=True)
+        for selector in DATE_SELECTORS:
+            found = selector(doc)
+            if found:
+                elem = found[0]
+                date_str = elem.get('datetime') or _text_content(elem)
                 dom_date = parse_flexible_date(date_str)
                 if dom_date:
                     return dom_date
         
         return url_date or datetime.now()
     
-    def extract_content(self, soup: BeautifulSoup) -> Optional[BeautifulSoup]:
+    def extract_content(self, doc: lxml.html.HtmlElement) -> Optional[lxml.html.HtmlElement]:
         """
         Extract main content using trafilatura for theme-agnostic extraction.
         
         Args:
-            soup: BeautifulSoup object of the page
+            doc: Parsed HTML document of the page
             
         Returns:
-            BeautifulSoup object with extracted content, or None if extraction fails
+            Div element with extracted content, or None if extraction fails
         """
+        # Imported on first use: trafilatura pulls in a large dependency tree
+        # that nothing else in the exporter needs
+        import trafilatura
+        
         try:
-            # Convert soup to string for trafilatura
-            html_str = str(soup)
-            
-            # Use trafilatura to extract content
-            extracted = trafilatura.extract(
-                html_str,
-                include_comments=False,
-                include_tables=True,
-                include_images=True,
-                include_links=True,
-                output_format='xml'
-            )
+            # Fast mode skips trafilatura's readability/jusText comparison,
+            # which dominates its runtime; only fall back to the full
+            # extractor when the fast pass finds nothing
+            extracted = None
+            for fast in (True, False):
+                # trafilatura takes the parsed tree directly (and works on a
+                # copy), so the page is not serialized and parsed again
+                extracted = trafilatura.extract(
+                    doc,
+                    include_comments=False,
+                    include_tables=True,
+                    include_images=True,
+                    include_links=True,
+                    output_format='xml',
+                    fast=fast,
+                )
+                if extracted:
+                    break
             
             if not extracted:
                 logger.debug("Trafilatura returned no content")
@@ -231,122 +412,105 @@ class WXRExporter:
             
             # Convert extracted XML back to HTML
             try:
-                content_soup = BeautifulSoup(extracted, 'lxml')
+                content_doc = lxml.html.document_fromstring(extracted)
+                _collapse_blank_text(content_doc)
+                body = content_doc.find('body')
                 
                 # Trafilatura returns XML, convert to HTML div
-                content_div = soup.new_tag('div')
-                content_div['class'] = 'extracted-content'
+                content_div = lxml.html.Element('div', {'class': 'extracted-content'})
                 
-                # Move all content into the div
-                for elem in content_soup.find('body').children if content_soup.find('body') else []:
-                    if elem.name:  # Skip text nodes
+                # Move all content into the div, skipping text nodes
+                for elem in list(body) if body is not None else []:
+                    if isinstance(elem.tag, str):
+                        elem.tail = None
                         content_div.append(elem)
                 
-                return content_div if content_div.contents else None
+                return content_div if len(content_div) else None
                 
             except Exception as e:
                 logger.debug(f"Failed to parse trafilatura output: {e}")
                 # Fallback: wrap extracted text in div
-                content_div = soup.new_tag('div')
-                content_div.string = extracted
+                content_div = lxml.html.Element('div')
+                content_div.text = extracted
                 return content_div
                 
         except Exception as e:
             logger.debug(f"Trafilatura extraction failed: {e}")
             return None
     
-    def extract_content_fallback(self, soup: BeautifulSoup) -> Optional[BeautifulSoup]:
-        """Fallback content extraction using CSS selectors."""
+    def extract_content_fallback(self, doc: lxml.html.HtmlElement) -> Optional[lxml.html.HtmlElement]:
+        """Fallback content extraction using common theme selectors."""
         content = None
         
         # Try to find content area
-        selectors = [
-            '.entry-content',
-            '.post-content',
-            'article .content',
-            '.single-content',
-            'article',
-        ]
-        
-        for selector in selectors:
-            content = soup.select_one(selector)
-            if content:
+        for selector in CONTENT_SELECTORS:
+            found = selector(doc)
+            if found:
+                content = found[0]
                 break
         
-        if not content:
+        if content is None:
             return None
         
         # Make a copy to work with
-        content = BeautifulSoup(str(content), 'lxml')
+        content = copy.deepcopy(content)
+        content.tail = None
         
         # Remove unwanted elements
-        remove_selectors = [
-            'script', 'style', 'noscript',
-            '.post-title', '.entry-title',
-            '.entry-meta', '.post-meta', '.date',
-            '#comments', '.comments',
-            '.sharedaddy', '.sd-sharing',
-            '.post-navigation',
-            'nav', 'aside', 'header', 'footer',
-        ]
-        
-        for selector in remove_selectors:
-            for elem in content.select(selector):
-                elem.decompose()
+        for elem in REMOVE_SELECTOR(content):
+            if elem.getparent() is not None:
+                elem.drop_tree()
         
         # Remove empty paragraphs
-        for p in content.find_all(['p', 'div']):
-            if not p.get_text(strip=True) and not p.find('img'):
-                p.decompose()
+        for p in list(content.iter('p', 'div')):
+            if not _has_text(p) and p.find('.//img') is None and p.getparent() is not None:
+                p.drop_tree()
         
         return content
     
-    def extract_categories(self, soup: BeautifulSoup) -> List[str]:
-        """Extract post categories using rel attribute."""
-        categories = []
-        seen = set()
-        
-        # Find categories using rel="category tag" or rel="category"
-        for link in soup.find_all('a', href=True, rel=True):
-            rel = ' '.join(link.get('rel', []))
-            href = link['href']
-            text = link.get_text(strip=True)
+    def extract_taxonomies(self, doc: lxml.html.HtmlElement) -> Tuple[List[str], List[str]]:
+        """
+        Extract post categories and tags using the rel attribute.
+        
+        Args:
+            doc: Parsed HTML document of the page
             
-            # Look for rel="category tag" or rel="category" with /category/ in URL
-            if 'category' in rel and '/category/' in href and text:
-                if text not in seen:
-                    categories.append(text)
-                    seen.add(text)
+        Returns:
+            Tuple of (categories, tags), each de-duplicated in page order
+        """
+        # Insertion-ordered dicts double as ordered sets
+        categories: Dict[str, None] = {}
+        tags: Dict[str, None] = {}
         
-        return categories
-    
-    def extract_tags(self, soup: BeautifulSoup) -> List[str]:
-        """Extract post tags using rel attribute."""
-        tags = []
-        seen = set()
-        
-        # Find tags using rel="tag" (not "category tag")
-        for link in soup.find_all('a', href=True, rel=True):
-            rel = ' '.join(link.get('rel', []))
-            href = link['href']
-            text = link.get_text(strip=True)
+        for link in TAXONOMY_LINKS(doc):
+            rel = ' '.join(link.get('rel').split())
+            href = link.get('href')
+            
+            # rel="tag" (not "category tag") with /tag/ in URL
+            if rel == 'tag' and '/tag/' in href:
+                found = tags
+            # rel="category tag" or rel="category" with /category/ in URL
+            elif 'category' in rel and '/category/' in href:
+                found = categories
+            else:
+                continue
             
-            # Look for rel="tag" (not "category tag") with /tag/ in URL
-            if rel == 'tag' and '/tag/' in href and text:
-                if text not in seen:
-                    tags.append(text)
-                    seen.add(text)
+            text = _text_content(link)
+            if text:
+                found[text] = None
         
-        return tags
+        return list(categories), list(tags)
     
     def get_or_create_category(self, name: str) -> int:
         """Get or create category term ID."""
         if name in self.categories:
-            return self.categories[name]
+            return self.categories[name][0]
         
         term_id = self.next_term_id
         self.next_term_id += 1
-        self.categories[name] = term_id
+        slug = _SLUG_RE.sub('-', name.lower())
+        self.categories[name] = (term_id, slug)
+        self._cat_attrib[name] = {'domain': "category", 'nicename': slug}
         self.stats['categories'] += 1
         
         return term_id
@@ -354,151 +518,189 @@ class WXRExporter:
     def get_or_create_tag(self, name: str) -> int:
         """Get or create tag term ID."""
         if name in self.tags:
-            return self.tags[name]
+            return self.tags[name][0]
         
         term_id = self.next_term_id
         self.next_term_id += 1
-        self.tags[name] = term_id
+        slug = _SLUG_RE.sub('-', name.lower())
+        self.tags[name] = (term_id, slug)
+        self._tag_attrib[name] = {'domain': "post_tag", 'nicename': slug}
         self.stats['tags'] += 1
         
         return term_id
     
-    def build_channel_element(self, root: ET.Element) -> ET.Element:
-        """Build RSS channel element with site info."""
-        channel = ET.SubElement(root, 'channel')
-        
-        ET.SubElement(channel, 'title').text = self.site_title
-        ET.SubElement(channel, 'link').text = self.site_url
-        ET.SubElement(channel, 'description').text = f"Import from {self.config.domain}"
-        ET.SubElement(channel, 'pubDate').text = format_datetime(datetime.now())
-        ET.SubElement(channel, 'language').text = "en"
-        ET.SubElement(channel, 'wp:wxr_version').text = "1.2"
-        ET.SubElement(channel, 'wp:base_site_url').text = self.site_url
-        ET.SubElement(channel, 'wp:base_blog_url').text = self.site_url
+    def write_channel_info(self, xf: etree.xmlfile) -> None:
+        """Write RSS channel site info and author."""
+        _write_element(xf, 'title', self.site_title)
+        _write_element(xf, 'link', self.site_url)
+        _write_element(xf, 'description', f"Import from {self.config.domain}")
+        _write_element(xf, 'pubDate', format_datetime(datetime.now()))
+        _write_element(xf, 'language', "en")
+        _write_element(xf, WP + 'wxr_version', "1.2")
+        _write_element(xf, WP + 'base_site_url', self.site_url)
+        _write_element(xf, WP + 'base_blog_url', self.site_url)
         
         # Author
-        author = ET.SubElement(channel, 'wp:author')
-        ET.SubElement(author, 'wp:author_login').text = self.author_name
-        ET.SubElement(author, 'wp:author_email').text = self.author_email
-        ET.SubElement(author, 'wp:author_display_name').text = self.author_name
-        ET.SubElement(author, 'wp:author_first_name').text = self.author_name
-        
-        return channel
+        with _open_element(xf, WP + 'author'):
+            _write_element(xf, WP + 'author_login', self.author_name, depth=3)
+            _write_element(xf, WP + 'author_email', self.author_email, depth=3)
+            _write_element(xf, WP + 'author_display_name', self.author_name, depth=3)
+            _write_element(xf, WP + 'author_first_name', self.author_name, depth=3)
     
-    def add_taxonomies(self, channel: ET.Element) -> None:
-        """Add category and tag terms to channel."""
+    def write_taxonomies(self, xf: etree.xmlfile) -> None:
+        """Write category and tag terms to the channel."""
         # Categories
-        for name, term_id in self.categories.items():
-            term = ET.SubElement(channel, 'wp:category')
-            ET.SubElement(term, 'wp:term_id').text = str(term_id)
-            ET.SubElement(term, 'wp:category_nicename').text = re.sub(r'\s+', '-', name.lower())
-            ET.SubElement(term, 'wp:category_parent').text = ""
-            ET.SubElement(term, 'wp:cat_name').text = f"<![CDATA[{name}]]>"
+        for name, (term_id, slug) in self.categories.items():
+            with _open_element(xf, WP + 'category'):
+                _write_element(xf, WP + 'term_id', str(term_id), depth=3)
+                _write_element(xf, WP + 'category_nicename', slug, depth=3)
+                _write_element(xf, WP + 'category_parent', "", depth=3)
+                _write_element(xf, WP + 'cat_name', _cdata(name), depth=3)
         
         # Tags
-        for name, term_id in self.tags.items():
-            term = ET.SubElement(channel, 'wp:tag')
-            ET.SubElement(term, 'wp:term_id').text = str(term_id)
-            ET.SubElement(term, 'wp:tag_slug').text = re.sub(r'\s+', '-', name.lower())
-            ET.SubElement(term, 'wp:tag_name').text = f"<![CDATA[{name}]]>"
+        for name, (term_id, slug) in self.tags.items():
+            with _open_element(xf, WP + 'tag'):
+                _write_element(xf, WP + 'term_id', str(term_id), depth=3)
+                _write_element(xf, WP + 'tag_slug', slug, depth=3)
+                _write_element(xf, WP + 'tag_name', _cdata(name), depth=3)
     
-    def add_post_item(self, channel: ET.Element, post_data: Dict) -> None:
-        """Add a post item to the channel."""
-        item = ET.SubElement(channel, 'item')
-        
-        ET.SubElement(item, 'title').text = post_data['title']
-        ET.SubElement(item, 'link').text = post_data['url']
-        ET.SubElement(item, 'pubDate').text = format_datetime(post_data['date'])
-        ET.SubElement(item, 'dc:creator').text = f"<![CDATA[{self.author_name}]]>"
-        ET.SubElement(item, 'guid', isPermaLink="false").text = post_data['url']
-        ET.SubElement(item, 'description')
-        ET.SubElement(item, 'content:encoded').text = f"<![CDATA[{post_data['content']}]]>"
-        ET.SubElement(item, 'excerpt:encoded').text = "<![CDATA[]]>"
-        ET.SubElement(item, 'wp:post_id').text = str(post_data['post_id'])
-        ET.SubElement(item, 'wp:post_date').text = post_data['date'].strftime('%Y-%m-%d %H:%M:%S')
-        ET.SubElement(item, 'wp:post_date_gmt').text = post_data['date'].strftime('%Y-%m-%d %H:%M:%S')
-        ET.SubElement(item, 'wp:comment_status').text = "open"
-        ET.SubElement(item, 'wp:ping_status').text = "open"
-        ET.SubElement(item, 'wp:post_name').text = post_data['slug']
-        ET.SubElement(item, 'wp:status').text = "publish"
-        ET.SubElement(item, 'wp:post_parent').text = "0"
-        ET.SubElement(item, 'wp:menu_order').text = "0"
-        # Use post_type from data, default to 'post'
-        ET.SubElement(item, 'wp:post_type').text = post_data.get('post_type', 'post')
-        ET.SubElement(item, 'wp:post_password').text = ""
-        ET.SubElement(item, 'wp:is_sticky').text = "0"
-        
-        # Categories
-        for cat_name in post_data.get('categories', []):
-            cat = ET.SubElement(item, 'category', domain="category", nicename=re.sub(r'\s+', '-', cat_name.lower()))
-            cat.text = f"<![CDATA[{cat_name}]]>"
-        
-        # Tags
-        for tag_name in post_data.get('tags', []):
-            tag = ET.SubElement(item, 'category', domain="post_tag", nicename=re.sub(r'\s+', '-', tag_name.lower()))
-            tag.text = f"<![CDATA[{tag_name}]]>"
+    def write_post_item(self, xf: etree.xmlfile, post_data: Dict) -> None:
+        """Write a post item to the channel (its terms must be registered)."""
+        post_date = post_data['date'].strftime('%Y-%m-%d %H:%M:%S')
+        
+        with _open_element(xf, 'item'):
+            _write_element(xf, 'title', post_data['title'], depth=3)
+            _write_element(xf, 'link', post_data['url'], depth=3)
+            _write_element(xf, 'pubDate', format_datetime(post_data['date']), depth=3)
+            _write_element(xf, DC + 'creator', _cdata(self.author_name), depth=3)
+            _write_element(xf, 'guid', post_data['url'], depth=3, attrib={'isPermaLink': "false"})
+            _write_element(xf, 'description', depth=3)
+            _write_element(xf, CONTENT + 'encoded', _cdata(post_data['content']), depth=3)
+            _write_element(xf, EXCERPT + 'encoded', _cdata(''), depth=3)
+            _write_element(xf, WP + 'post_id', str(post_data['post_id']), depth=3)
+            _write_element(xf, WP + 'post_date', post_date, depth=3)
+            _write_element(xf, WP + 'post_date_gmt', post_date, depth=3)
+            _write_element(xf, WP + 'comment_status', "open", depth=3)
+            _write_element(xf, WP + 'ping_status', "open", depth=3)
+            _write_element(xf, WP + 'post_name', post_data['slug'], depth=3)
+            _write_element(xf, WP + 'status', "publish", depth=3)
+            _write_element(xf, WP + 'post_parent', "0", depth=3)
+            _write_element(xf, WP + 'menu_order', "0", depth=3)
+            # Use post_type from data, default to 'post'
+            _write_element(xf, WP + 'post_type', post_data.get('post_type', 'post'), depth=3)
+            _write_element(xf, WP + 'post_password', "", depth=3)
+            _write_element(xf, WP + 'is_sticky', "0", depth=3)
+            
+            # Categories
+            for cat_name in post_data.get('categories', []):
+                _write_element(
+                    xf, 'category', _cdata(cat_name), depth=3,
+                    attrib=self._cat_attrib[cat_name]
+                )
+            
+            # Tags
+            for tag_name in post_data.get('tags', []):
+                _write_element(
+                    xf, 'category', _cdata(tag_name), depth=3,
+                    attrib=self._tag_attrib[tag_name]
+                )
     
-    def process_post(self, post: Dict[str, str]) -> Optional[Dict]:
-        """Process a single post and extract all data."""
+    def extract_post(self, post: Dict[str, str]) -> Optional[Dict]:
+        """
+        Parse and extract a single post without touching exporter state.
+        
+        Safe to run in a worker process. Post ID, slug fallback and
+        taxonomy registration are left to register_post().
+        """
         try:
+            # Read raw bytes in one call; lxml decodes them during parsing
             html_path = Path(post['local_path'])
-            if not html_path.exists():
+            try:
+                html = self.dewrap_wayback_urls(html_path.read_bytes())
+            except FileNotFoundError:
                 logger.warning(f"HTML file not found: {html_path}")
                 return None
             
-            with open(html_path, 'r', encoding='utf-8') as f:
-                soup = BeautifulSoup(f.read(), 'lxml')
+            # Truncated or failed snapshots are saved as empty files
+            if not html or html.isspace():
+                logger.warning(f"No content found for {post['url']}")
+                return None
+            
+            # Clean Wayback elements (fix lazy images, strip chrome)
+            doc = lxml.html.document_fromstring(html, parser=_HTML_PARSER)
+            self.clean_wayback_markup(doc)
             
-            # Clean Wayback elements - IMPORTANT ORDER:
-            # 1. Dewrap URLs (convert web.archive.org to original URLs)
-            # 2. Normalize lazy images (promote data-lazy-src to src)
-            # 3. Strip Wayback chrome (remove UI elements)
-            # This ensures lazy-src has original URLs and images are working
-            self.dewrap_wayback_urls(soup)
-            self.normalize_lazy_images(soup)
-            self.strip_wayback_chrome(soup)
+            # Extract metadata and taxonomies while the page is untouched
+            title = self.extract_title(doc)
+            date = self.extract_date(doc, post['url'])
+            categories, tags = self.extract_taxonomies(doc)
             
-            # Extract metadata
-            title = self.extract_title(soup)
-            date = self.extract_date(soup, post['url'])
-            slug = extract_slug_from_url(post['url']) or f"post-{self.next_post_id}"
-            content_elem = self.extract_content(soup)
+            # Content extraction goes last so nothing depends on the page
+            # surviving it unchanged
+            content_elem = self.extract_content(doc)
             
-            if not content_elem:
+            if content_elem is None:
                 logger.warning(f"No content found for {post['url']}")
                 return None
             
-            content = str(content_elem)
-            
-            # Extract taxonomies
-            categories = self.extract_categories(soup)
-            tags = self.extract_tags(soup)
-            
-            # Register taxonomies
-            for cat in categories:
-                self.get_or_create_category(cat)
-            for tag in tags:
-                self.get_or_create_tag(tag)
+            content = lxml.html.tostring(content_elem, encoding='unicode', with_tail=False)
             
-            post_data = {
-                'post_id': self.next_post_id,
+            return {
                 'url': post['url'],
                 'title': title,
                 'date': date,
-                'slug': slug,
+                'slug': extract_slug_from_url(post['url']),
                 'content': content,
                 'categories': categories,
                 'tags': tags,
                 'post_type': post.get('post_type', 'post'),
             }
-            
-            self.next_post_id += 1
-            return post_data
         
         except Exception as e:
             logger.error(f"Failed to process {post['url']}: {e}")
             return None
     
+    def register_post(self, post_data: Dict) -> Dict:
+        """Assign a post ID and register the post's taxonomies."""
+        for cat in post_data['categories']:
+            self.get_or_create_category(cat)
+        for tag in post_data['tags']:
+            self.get_or_create_tag(tag)
+        
+        post_id = self.next_post_id
+        self.next_post_id = post_id + 1
+        
+        post_data['post_id'] = post_id
+        if not post_data['slug']:
+            post_data['slug'] = f"post-{post_id}"
+        
+        return post_data
+    
+    def process_post(self, post: Dict[str, str]) -> Optional[Dict]:
+        """Process a single post and extract all data."""
+        post_data = self.extract_post(post)
+        if post_data:
+            return self.register_post(post_data)
+        return None
+    
+    def iter_extracted_posts(self, posts: List[Dict[str, str]]) -> Iterator[Optional[Dict]]:
+        """
+        Extract posts in input order, spread across CPU cores.
+        
+        Parsing and content extraction are CPU-bound and independent per
+        post, so they run in a process pool; a single post is extracted
+        inline rather than paying for pool startup.
+        """
+        if len(posts) < 2:
+            yield from map(self.extract_post, posts)
+            return
+        
+        with ProcessPoolExecutor(
+            initializer=_init_export_worker,
+            initargs=(self.config,),
+        ) as pool:
+            yield from pool.map(_extract_post_worker, posts, chunksize=EXPORT_CHUNK_SIZE)
+    
     def export(self) -> Path:
         """
         Main export process.
@@ -510,48 +712,33 @@ class WXRExporter:
         
         logger.info(f"Starting WXR export for {len(posts)} posts")
         
-        # Register namespaces
-        ET.register_namespace('', 'http://purl.org/rss/1.0/modules/content/')
-        ET.register_namespace('wp', 'http://wordpress.org/export/1.2/')
-        ET.register_namespace('dc', 'http://purl.org/dc/elements/1.1/')
-        ET.register_namespace('excerpt', 'http://wordpress.org/export/1.2/excerpt/')
-        
-        # Build XML structure
-        root = ET.Element('rss', version="2.0")
-        root.set('xmlns:content', 'http://purl.org/rss/1.0/modules/content/')
-        root.set('xmlns:wp', 'http://wordpress.org/export/1.2/')
-        root.set('xmlns:dc', 'http://purl.org/dc/elements/1.1/')
-        root.set('xmlns:excerpt', 'http://wordpress.org/export/1.2/excerpt/')
-        
-        channel = self.build_channel_element(root)
-        
-        # Process posts
-        post_data_list = []
-        for i, post in enumerate(posts, 1):
-            if i % 50 == 0:
-                logger.info(f"Processing: {i}/{len(posts)}")
-                import sys
-                sys.stdout.flush()
+        # Process posts, spooling each result to a temp file so that only
+        # the (small) taxonomy maps stay in memory. Terms must be written
+        # before items, and are only known once every post is processed.
+        with tempfile.TemporaryFile() as spool:
+            for i, post_data in enumerate(self.iter_extracted_posts(posts), 1):
+                if i % 50 == 0:
+                    logger.info(f"Processing: {i}/{len(posts)}")
+                    sys.stdout.flush()
+                
+                if post_data:
+                    self.register_post(post_data)
+                    pickle.dump(post_data, spool, pickle.HIGHEST_PROTOCOL)
+                    self.stats['posts'] += 1
             
-            post_data = self.process_post(post)
-            if post_data:
-                post_data_list.append(post_data)
-                self.stats['posts'] += 1
-        
-        # Add taxonomies
-        self.add_taxonomies(channel)
-        
-        # Add posts
-        for post_data in post_data_list:
-            self.add_post_item(channel, post_data)
-        
-        # Generate XML
-        xml_str = minidom.parseString(ET.tostring(root, encoding='unicode')).toprettyxml(indent="  ")
-        
-        # Save to file
-        output_path = self.config.get_paths()['wxr_export']
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(xml_str)
+            spool.seek(0)
+            
+            # Stream the document out element by element
+            output_path = self.paths['wxr_export']
+            with etree.xmlfile(str(output_path), encoding='UTF-8') as xf:
+                xf.write_declaration()
+                with xf.element('rss', {'version': "2.0"}, nsmap=NSMAP):
+                    with _open_element(xf, 'channel', depth=1):
+                        self.write_channel_info(xf)
+                        self.write_taxonomies(xf)
+                        for _ in range(self.stats['posts']):
+                            self.write_post_item(xf, pickle.load(spool))
+                    xf.write('\n')
         
         logger.info(f"Export complete:")
         logger.info(f"  Posts: {self.stats['posts']}")
@@ -567,6 +754,21 @@ class WXRExporter:
         return output_path
 
 
+# Per-process exporter used by _extract_post_worker
+_worker_exporter: Optional[WXRExporter] = None
+
+
+def _init_export_worker(config: ProjectConfig) -> None:
+    """Create the exporter used by this worker process."""
+    global _worker_exporter
+    _worker_exporter = WXRExporter(config)
+
+
+def _extract_post_worker(post: Dict[str, str]) -> Optional[Dict]:
+    """Extract a post in a worker process (module-level for pickling)."""
+    return _worker_exporter.extract_post(post)
+
+
 def export_wxr(
     config: ProjectConfig,
     site_title: Optional[str] = None,
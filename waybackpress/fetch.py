@@ -4,13 +4,19 @@ Media fetching from Wayback Machine with multi-pass retry.
 
 import asyncio
 import csv
+import json
 import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, fields
 from pathlib import Path
-from typing import List, Dict, Any, Set, Optional
-from urllib.parse import urlparse, urljoin
+from typing import AsyncIterator, List, Dict, Any, Set, Optional, Tuple
+from urllib.parse import urlparse, urljoin, unquote
 
 import aiohttp
-from bs4 import BeautifulSoup
+from lxml import etree
 
 from .config import ProjectConfig
 from .utils import (
@@ -23,20 +29,137 @@ from .utils import (
 
 logger = logging.getLogger('waybackpress.fetch')
 
+# Archived pages are decoded as UTF-8; only tag attributes are needed, so
+# comments and PIs are dropped at parse time
+_HTML_PARSER = etree.HTMLParser(
+    encoding='utf-8',
+    remove_comments=True,
+    remove_pis=True,
+    collect_ids=False,
+)
+
+# Image and script sources plus stylesheet links, in a single tree walk
+MEDIA_URLS = etree.XPath(
+    "//img/@src"
+    " | //link[contains(concat(' ', normalize-space(@rel), ' '), ' stylesheet ')]/@href"
+    " | //script/@src"
+)
+
+# Below this many posts, media discovery runs inline without a process pool
+PARALLEL_DISCOVERY_MIN_POSTS = 32
+
+# Posts sent to each discovery worker per batch
+DISCOVERY_CHUNK_SIZE = 16
+
+# Slotted instances where supported (dataclass slots need Python 3.10+)
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
+class FetchResult:
+    """Outcome of fetching one media asset; one row of the media report."""
+    
+    asset_url: str
+    local_path: str
+    status: str = 'FAIL'
+    snapshots_tried: int = 0
+    snapshots_available: Optional[int] = 0
+    success_timestamp: Optional[str] = None
+    size: Optional[int] = None
+    
+    def as_row(self) -> List[Any]:
+        """Values in media report column order."""
+        return [
+            self.asset_url, self.local_path, self.status, self.snapshots_tried,
+            self.snapshots_available, self.success_timestamp, self.size
+        ]
+
+
+# Columns of the media report CSV
+REPORT_FIELDS = [f.name for f in fields(FetchResult)]
+
+# Positions of the report columns read back on later passes
+URL_COLUMN = REPORT_FIELDS.index('asset_url')
+STATUS_COLUMN = REPORT_FIELDS.index('status')
+SNAPSHOTS_COLUMN = REPORT_FIELDS.index('snapshots_available')
+
+# Completed downloads between progress updates and report flushes
+PROGRESS_INTERVAL = 50
+
+# Bytes read from a download response per write
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Maximum captures returned by a directory-wide CDX prefix query
+CDX_PREFIX_LIMIT = 5000
+
+# Download statuses meaning the archive wants us to slow down
+THROTTLE_STATUSES = {429, 503}
+
 
 class MediaFetcher:
     """Fetches media assets from Wayback Machine."""
     
     def __init__(self, config: ProjectConfig, pass_number: int = 1):
         self.config = config
+        self.paths = config.get_paths()
         self.pass_number = pass_number
         self.media_urls: Set[str] = set()
-        self.results: List[Dict[str, Any]] = []
-        self.semaphore = asyncio.Semaphore(config.concurrency)
+        self.results: List[FetchResult] = []
+        self.snapshots: Dict[str, List[str]] = {}
+        self.created_dirs: Set[Path] = set()
+        
+        # Admission control: an explicit slot count under a condition, so the
+        # limit can shrink when the archive throttles us and grow back later
+        self.slots = asyncio.Condition()
+        self.active = 0
+        self.max_active = config.concurrency
+        self.clean_responses = 0
+    
+    @asynccontextmanager
+    async def admission(self) -> AsyncIterator[None]:
+        """Hold one of the currently allowed request slots."""
+        async with self.slots:
+            await self.slots.wait_for(lambda: self.active < self.max_active)
+            self.active += 1
+        try:
+            yield
+        finally:
+            async with self.slots:
+                self.active -= 1
+                self.slots.notify()
+    
+    async def adjust_concurrency(self, throttled: bool) -> None:
+        """
+        Adapt the number of request slots to how the archive is responding.
+        
+        A throttling response halves the limit; after as many clean responses
+        as there are slots, one slot is added back, up to the configured
+        concurrency.
+        
+        Args:
+            throttled: Whether the last response asked us to slow down
+        """
+        if throttled:
+            self.clean_responses = 0
+            if self.max_active > 1:
+                self.max_active //= 2
+                logger.info(f"Archive is throttling, reducing concurrency to {self.max_active}")
+            return
+        
+        if self.max_active >= self.config.concurrency:
+            return
+        
+        self.clean_responses += 1
+        if self.clean_responses >= self.max_active:
+            self.clean_responses = 0
+            async with self.slots:
+                self.max_active += 1
+                self.slots.notify_all()
+            logger.debug(f"Raising concurrency to {self.max_active}")
     
     def load_valid_posts(self) -> List[Dict[str, str]]:
         """Load validated posts."""
-        posts_file = self.config.get_paths()['valid_posts']
+        posts_file = self.paths['valid_posts']
         
         if not posts_file.exists():
             raise FileNotFoundError(
@@ -58,7 +181,8 @@ class MediaFetcher:
         logger.info(f"Loaded {len(posts)} validated posts")
         return posts
     
-    def extract_media_urls(self, html_path: Path, base_url: str) -> Set[str]:
+    @staticmethod
+    def extract_media_urls(html_path: Path, base_url: str) -> Set[str]:
         """
         Extract media URLs from HTML file.
         
@@ -70,30 +194,11 @@ class MediaFetcher:
             Set of absolute media URLs
         """
         try:
-            with open(html_path, 'r', encoding='utf-8') as f:
-                soup = BeautifulSoup(f.read(), 'lxml')
+            tree = etree.parse(str(html_path), _HTML_PARSER)
             
+            # Pages repeat the same sources, so resolve each distinct one once
             media_urls = set()
-            
-            # Images
-            for img in soup.find_all('img'):
-                src = img.get('src')
-                if src:
-                    absolute_url = urljoin(base_url, src)
-                    if absolute_url.startswith('http'):
-                        media_urls.add(absolute_url)
-            
-            # CSS files
-            for link in soup.find_all('link', rel='stylesheet'):
-                href = link.get('href')
-                if href:
-                    absolute_url = urljoin(base_url, href)
-                    if absolute_url.startswith('http'):
-                        media_urls.add(absolute_url)
-            
-            # JavaScript files
-            for script in soup.find_all('script'):
-                src = script.get('src')
+            for src in set(MEDIA_URLS(tree)):
                 if src:
                     absolute_url = urljoin(base_url, src)
                     if absolute_url.startswith('http'):
@@ -114,22 +219,39 @@ class MediaFetcher:
         """
         logger.info("Discovering media URLs from posts")
         
-        for post in posts:
-            html_path = Path(post['local_path'])
-            if not html_path.exists():
-                continue
-            
-            media = self.extract_media_urls(html_path, post['url'])
-            self.media_urls.update(media)
+        posts = [post for post in posts if Path(post['local_path']).exists()]
+        
+        # Parsing is CPU-bound and independent per post, so larger sites are
+        # spread across CPU cores; small ones aren't worth the pool startup
+        if len(posts) < PARALLEL_DISCOVERY_MIN_POSTS:
+            for media in map(_extract_media_worker, posts):
+                self.media_urls.update(media)
+        else:
+            with ProcessPoolExecutor() as pool:
+                for media in pool.map(_extract_media_worker, posts, chunksize=DISCOVERY_CHUNK_SIZE):
+                    self.media_urls.update(media)
+        
+        # Scheme, query-string and fragment variants of an asset (such as
+        # ?ver= cache busters) share a local path, so only one of them is
+        # fetched: the shortest, i.e. the bare URL wherever it was linked
+        variants: Dict[Tuple[str, str], str] = {}
+        for url in sorted(self.media_urls, key=lambda url: (len(url), url)):
+            parsed = urlparse(url)
+            variants.setdefault((parsed.netloc.lower(), unquote(parsed.path)), url)
+        
+        folded = len(self.media_urls) - len(variants)
+        self.media_urls = set(variants.values())
         
         logger.info(f"Found {len(self.media_urls)} unique media URLs")
+        if folded:
+            logger.info(f"Skipped {folded} variant URLs of the same files")
     
     async def get_snapshots(
         self,
         session: aiohttp.ClientSession,
         url: str,
         limit: int = 20
-    ) -> List[str]:
+    ) -> Optional[List[str]]:
         """
         Get available Wayback snapshots for a URL.
         
@@ -139,7 +261,8 @@ class MediaFetcher:
             limit: Maximum number of snapshots to return
             
         Returns:
-            List of timestamps
+            List of timestamps (empty if the URL was never archived), or
+            None if the lookup itself failed
         """
         cdx_url = (
             f"https://web.archive.org/cdx/search/cdx"
@@ -151,9 +274,11 @@ class MediaFetcher:
         try:
             async with session.get(cdx_url, timeout=aiohttp.ClientTimeout(total=10)) as response:
                 if response.status != 200:
-                    return []
+                    return None
                 
-                data = await response.json()
+                # json decodes the raw bytes itself, skipping aiohttp's
+                # content-type check and charset sniffing
+                data = json.loads(await response.read())
                 if len(data) < 2:  # Header + at least one result
                     return []
                 
@@ -163,14 +288,104 @@ class MediaFetcher:
         
         except Exception as e:
             logger.debug(f"CDX query failed for {truncate_string(url)}: {e}")
-            return []
+            return None
+    
+    async def prefetch_snapshots(
+        self,
+        session: aiohttp.ClientSession,
+        urls: List[str]
+    ) -> None:
+        """
+        Look up snapshots for whole media directories up front.
+        
+        Assets tend to share directories (e.g. wp-content/uploads/2021/05/),
+        so each directory holding several of them is queried once with a
+        CDX prefix match instead of once per asset. Assets at the site root
+        are left to per-asset lookups. Hits are stored in self.snapshots;
+        anything not found falls back to get_snapshots.
+        
+        Args:
+            session: aiohttp session
+            urls: URLs about to be downloaded
+        """
+        groups: Dict[str, List[str]] = {}
+        for url in urls:
+            parsed = urlparse(url)
+            directory = parsed.path.rsplit('/', 1)[0]
+            # A site-root prefix would scan the whole domain index and hit
+            # the row limit long before reaching the root assets
+            if not directory:
+                continue
+            groups.setdefault(f"{parsed.scheme}://{parsed.netloc}{directory}/", []).append(url)
+        
+        prefixes = {prefix: members for prefix, members in groups.items() if len(members) > 1}
+        if not prefixes:
+            return
+        
+        logger.info(f"Prefetching snapshots for {len(prefixes)} media directories")
+        
+        await asyncio.gather(*[
+            self._prefetch_prefix(session, prefix, members)
+            for prefix, members in prefixes.items()
+        ])
+        
+        logger.info(f"Prefetched snapshots for {len(self.snapshots)} media URLs")
+    
+    async def _prefetch_prefix(
+        self,
+        session: aiohttp.ClientSession,
+        prefix: str,
+        members: List[str]
+    ) -> None:
+        """Query one directory prefix and cache snapshots for its members."""
+        cdx_url = (
+            f"https://web.archive.org/cdx/search/cdx"
+            f"?url={prefix}"
+            f"&matchType=prefix"
+            f"&output=json"
+            f"&fl=urlkey,timestamp,original"
+            f"&limit={CDX_PREFIX_LIMIT}"
+        )
+        
+        try:
+            async with self.admission():
+                async with session.get(cdx_url, timeout=aiohttp.ClientTimeout(total=30)) as response:
+                    if response.status != 200:
+                        return
+                    
+                    data = json.loads(await response.read())
+        
+        except Exception as e:
+            logger.debug(f"CDX prefix query failed for {truncate_string(prefix)}: {e}")
+            return
+        
+        rows = data[1:]  # Skip header
+        if not rows:
+            return
+        
+        # Captures are sorted by canonical URL key then timestamp, which is
+        # the same order a per-URL query returns them in
+        timestamps: Dict[str, List[str]] = {}
+        keys: Dict[str, str] = {}
+        for urlkey, timestamp, original in rows:
+            timestamps.setdefault(urlkey, []).append(timestamp)
+            keys.setdefault(original, urlkey)
+        
+        # A truncated response may have cut off the last URL's captures
+        if len(rows) >= CDX_PREFIX_LIMIT:
+            del timestamps[rows[-1][0]]
+        
+        for url in members:
+            found = timestamps.get(keys.get(url))
+            if found:
+                self.snapshots[url] = found
     
     async def download_asset(
         self,
         session: aiohttp.ClientSession,
         url: str,
         max_attempts: int = 5
-    ) -> Dict[str, Any]:
+    ) -> FetchResult:
         """
         Download a single media asset with multi-snapshot retry.
         
@@ -180,36 +395,39 @@ class MediaFetcher:
             max_attempts: Maximum snapshots to try
             
         Returns:
-            Result dict with status and metadata
+            FetchResult with status and metadata
         """
-        async with self.semaphore:
-            local_path = get_local_path_for_url(url, self.config.get_paths()['media'])
+        async with self.admission():
+            local_path = get_local_path_for_url(url, self.paths['media'])
             
-            result = {
-                'asset_url': url,
-                'local_path': str(local_path),
-                'status': 'FAIL',
-                'snapshots_tried': 0,
-                'snapshots_available': 0,
-                'success_timestamp': None,
-            }
+            result = FetchResult(asset_url=url, local_path=str(local_path))
             
             # Check if already downloaded
             if local_path.exists():
-                result['status'] = 'SKIP'
+                result.status = 'SKIP'
+                return result
+            
+            # Get available snapshots, prefetched where possible
+            timestamps = self.snapshots.get(url, [])[:max_attempts]
+            if not timestamps:
+                timestamps = await self.get_snapshots(session, url, limit=max_attempts)
+            
+            if timestamps is None:
+                # Leave the snapshot count unknown so later passes retry it
+                result.snapshots_available = None
+                logger.debug(f"Snapshot lookup failed: {truncate_string(url)}")
                 return result
             
-            # Get available snapshots
-            timestamps = await self.get_snapshots(session, url, limit=max_attempts)
-            result['snapshots_available'] = len(timestamps)
+            result.snapshots_available = len(timestamps)
             
             if not timestamps:
                 logger.debug(f"No snapshots: {truncate_string(url)}")
                 return result
             
             # Try each snapshot
+            part_path = local_path.with_name(local_path.name + '.part')
             for i, timestamp in enumerate(timestamps):
-                result['snapshots_tried'] = i + 1
+                result.snapshots_tried = i + 1
                 
                 wayback_url = construct_wayback_url(url, timestamp, 'im_')
                 
@@ -220,67 +438,68 @@ class MediaFetcher:
                         wayback_url,
                         timeout=aiohttp.ClientTimeout(total=30)
                     ) as response:
+                        await self.adjust_concurrency(response.status in THROTTLE_STATUSES)
+                        
                         if response.status == 200:
-                            content = await response.read()
+                            # Most assets share a few upload directories, so
+                            # each one is only created once per run
+                            if local_path.parent not in self.created_dirs:
+                                local_path.parent.mkdir(parents=True, exist_ok=True)
+                                self.created_dirs.add(local_path.parent)
                             
-                            # Save file
-                            local_path.parent.mkdir(parents=True, exist_ok=True)
-                            with open(local_path, 'wb') as f:
-                                f.write(content)
+                            # Stream to a partial file so large assets are never
+                            # held in memory, and an interrupted download never
+                            # leaves a file that a later pass would skip
+                            size = 0
+                            with open(part_path, 'wb') as f:
+                                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                                    f.write(chunk)
+                                    size += len(chunk)
+                            os.replace(part_path, local_path)
                             
-                            result['status'] = 'OK'
-                            result['success_timestamp'] = timestamp
-                            result['size'] = len(content)
+                            result.status = 'OK'
+                            result.success_timestamp = timestamp
+                            result.size = size
                             
-                            logger.debug(f"✓ Downloaded: {truncate_string(url)} ({format_bytes(len(content))})")
+                            logger.debug(f"✓ Downloaded: {truncate_string(url)} ({format_bytes(size)})")
                             return result
                 
                 except Exception as e:
                     logger.debug(f"Attempt {i+1} failed for {truncate_string(url)}: {e}")
+                    if part_path.exists():
+                        part_path.unlink()
                     continue
             
             # All attempts failed
-            logger.debug(f"✗ Failed after {result['snapshots_tried']} attempts: {truncate_string(url)}")
+            logger.debug(f"✗ Failed after {result.snapshots_tried} attempts: {truncate_string(url)}")
             return result
     
-    def load_previous_results(self) -> Dict[str, str]:
+    def load_previous_results(self) -> Dict[str, List[str]]:
         """
         Load results from previous passes to avoid re-downloading.
         
         Returns:
-            Dict mapping URL to status
+            Dict mapping URL to its media report row, as a list of values
+            in REPORT_FIELDS order
         """
-        report_file = self.config.get_paths()['media_report']
+        report_file = self.paths['media_report']
         
         if not report_file.exists():
             return {}
         
-        previous = {}
-        with open(report_file, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                previous[row['asset_url']] = row['status']
+        # Rows stay positional lists rather than a dict each, which halves
+        # load time on large reports
+        with open(report_file, 'r', newline='') as f:
+            reader = csv.reader(f)
+            if next(reader, None) != REPORT_FIELDS:
+                logger.warning(f"Ignoring {report_file}: unexpected columns")
+                return {}
+            
+            previous = {row[URL_COLUMN]: row for row in reader if row}
         
         logger.info(f"Loaded {len(previous)} results from previous pass")
         return previous
     
-    def save_results(self) -> None:
-        """Save fetch results to CSV."""
-        report_file = self.config.get_paths()['media_report']
-        
-        logger.info(f"Saving {len(self.results)} results to {report_file}")
-        
-        with open(report_file, 'w', newline='') as f:
-            fieldnames = [
-                'asset_url', 'local_path', 'status', 'snapshots_tried',
-                'snapshots_available', 'success_timestamp', 'size'
-            ]
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            
-            for result in self.results:
-                writer.writerow(result)
-    
     async def fetch_all(self) -> Dict[str, int]:
         """
         Main media fetching process.
@@ -300,59 +519,99 @@ class MediaFetcher:
         previous = self.load_previous_results()
         
         # Filter out already successful downloads
-        to_fetch = [url for url in self.media_urls if previous.get(url) != 'OK']
+        done = {url for url, row in previous.items() if row[STATUS_COLUMN] == 'OK'}
+        
+        # Retry passes also skip assets the CDX index confirmed it has no
+        # captures of; those rows are carried into the new report as-is
+        unarchived: Set[str] = set()
+        if self.pass_number > 1:
+            unarchived = {
+                url for url, row in previous.items()
+                if row[STATUS_COLUMN] == 'FAIL' and row[SNAPSHOTS_COLUMN] == '0'
+            } & self.media_urls
         
-        if len(to_fetch) < len(self.media_urls):
-            already_done = len(self.media_urls) - len(to_fetch)
+        to_fetch = [url for url in self.media_urls if url not in done and url not in unarchived]
+        
+        already_done = len(self.media_urls & done)
+        if already_done:
             logger.info(f"Skipping {already_done} already downloaded files")
+        if unarchived:
+            logger.info(f"Skipping {len(unarchived)} files with no archived snapshots")
         
         logger.info(f"Starting media fetch (pass {self.pass_number})")
         logger.info(f"URLs to fetch: {len(to_fetch)}")
         logger.info(f"Concurrency: {self.config.concurrency}")
         logger.info(f"Delay: {self.config.delay}s")
         
-        async with aiohttp.ClientSession(
-            headers={'User-Agent': self.config.user_agent}
-        ) as session:
+        report_file = self.paths['media_report']
+        logger.info(f"Writing results to {report_file}")
+        
+        # Results are appended to the report as they complete and tallied in
+        # running counters, so progress never rescans or rewrites earlier rows
+        counts = {'OK': 0, 'FAIL': 0, 'SKIP': 0}
+        
+        with open(report_file, 'w', newline='') as report:
+            writer = csv.writer(report)
+            writer.writerow(REPORT_FIELDS)
+            writer.writerows(previous[url] for url in sorted(unarchived))
             
-            tasks = [self.download_asset(session, url) for url in to_fetch]
+            # Every request goes to web.archive.org, so keep a warm per-host
+            # pool alive across slow snapshots instead of re-handshaking
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.config.concurrency,
+                keepalive_timeout=75,
+                ttl_dns_cache=300,
+            )
             
-            # Process with progress tracking
-            for i, coro in enumerate(asyncio.as_completed(tasks), 1):
-                result = await coro
-                self.results.append(result)
+            async with aiohttp.ClientSession(
+                headers={'User-Agent': self.config.user_agent},
+                connector=connector,
+            ) as session:
                 
-                if i % 50 == 0:
-                    success = sum(1 for r in self.results if r['status'] == 'OK')
-                    logger.info(f"Progress: {i}/{len(to_fetch)} ({success} successful)")
-                    import sys
-                    sys.stdout.flush()
-                    # Save intermediate results
-                    self.save_results()
-            
-            # Final save
-            self.save_results()
-            
-            # Statistics
-            stats = {
-                'total': len(self.results),
-                'success': sum(1 for r in self.results if r['status'] == 'OK'),
-                'failed': sum(1 for r in self.results if r['status'] == 'FAIL'),
-                'skipped': sum(1 for r in self.results if r['status'] == 'SKIP'),
-            }
-            
-            logger.info("Media fetch complete:")
-            logger.info(f"  Total: {stats['total']}")
+                await self.prefetch_snapshots(session, to_fetch)
+                
+                tasks = [self.download_asset(session, url) for url in to_fetch]
+                
+                # Process with progress tracking
+                for i, coro in enumerate(asyncio.as_completed(tasks), 1):
+                    result = await coro
+                    self.results.append(result)
+                    writer.writerow(result.as_row())
+                    counts[result.status] += 1
+                    
+                    if i % PROGRESS_INTERVAL == 0:
+                        logger.info(f"Progress: {i}/{len(to_fetch)} ({counts['OK']} successful)")
+                        sys.stdout.flush()
+                        report.flush()
+        
+        # Statistics
+        stats = {
+            'total': len(self.results),
+            'success': counts['OK'],
+            'failed': counts['FAIL'],
+            'skipped': counts['SKIP'],
+        }
+        
+        logger.info("Media fetch complete:")
+        logger.info(f"  Total: {stats['total']}")
+        if stats['total']:
             logger.info(f"  Success: {stats['success']} ({stats['success']/stats['total']*100:.1f}%)")
-            logger.info(f"  Failed: {stats['failed']}")
-            logger.info(f"  Skipped: {stats['skipped']}")
-            
-            # Update config
-            self.config.media_fetched = True
-            config_path = self.config.output_dir / 'config.json'
-            self.config.save(config_path)
-            
-            return stats
+        else:
+            logger.info(f"  Success: {stats['success']}")
+        logger.info(f"  Failed: {stats['failed']}")
+        logger.info(f"  Skipped: {stats['skipped']}")
+        
+        # Update config
+        self.config.media_fetched = True
+        config_path = self.config.output_dir / 'config.json'
+        self.config.save(config_path)
+        
+        return stats
+
+
+def _extract_media_worker(post: Dict[str, str]) -> Set[str]:
+    """Extract a post's media URLs in a worker process (module-level for pickling)."""
+    return MediaFetcher.extract_media_urls(Path(post['local_path']), post['url'])
 
 
 async def fetch_media(config: ProjectConfig, pass_number: int = 1) -> Dict[str, int]:
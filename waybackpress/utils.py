@@ -5,12 +5,30 @@ Shared utility functions for WaybackPress.
 import re
 import hashlib
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Optional, Pattern, Tuple
 from urllib.parse import urlparse, unquote
 from dateutil import parser as dateparser
 
 
+# WordPress permalink patterns, used per post during validation and export
+_PERMALINK_RE = re.compile(r'/(\d{4})/(\d{2})/(\d{2})/([^/]+)/?$')
+_LAST_SEGMENT_RE = re.compile(r'/([^/]+)/?$')
+_URL_DATE_RE = re.compile(r'/(\d{4})/(\d{2})/(\d{2})/')
+
+# ISO 8601 timestamps as found in meta tags and <time datetime>: a date with
+# an optional time, fraction and UTC offset
+_ISO_DATE_RE = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})'
+    r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6}))?)?(?:Z|[+-]\d{2}:?\d{2})?)?'
+)
+
+# URL variations stripped by normalize_url: protocol and www. prefixes, and
+# anything from the first query/fragment marker on
+_NORMALIZE_RE = re.compile(r'(?:https?://)?(?:www\.)?([^?#]*)([?#])?')
+
+
 def normalize_url(url: str) -> str:
     """
     Normalize a URL by removing common variations.
@@ -21,19 +39,13 @@ def normalize_url(url: str) -> str:
     Returns:
         Normalized URL string
     """
-    # Remove protocol
-    url = re.sub(r'^https?://', '', url)
-    
-    # Remove www.
-    url = re.sub(r'^www\.', '', url)
+    # Remove protocol, www., query strings and fragments in one match
+    match = _NORMALIZE_RE.match(url)
     
-    # Remove trailing slash
-    url = url.rstrip('/')
-    
-    # Remove query strings and fragments
-    url = re.sub(r'[?#].*$', '', url)
-    
-    return url
+    # Remove trailing slash (one just before a query or fragment is kept)
+    if match.group(2):
+        return match.group(1)
+    return match.group(1).rstrip('/')
 
 
 def extract_slug_from_url(url: str) -> Optional[str]:
@@ -47,12 +59,12 @@ def extract_slug_from_url(url: str) -> Optional[str]:
         Post slug or None if not found
     """
     # Match WordPress permalink pattern: /YYYY/MM/DD/slug/
-    match = re.search(r'/(\d{4})/(\d{2})/(\d{2})/([^/]+)/?$', url)
+    match = _PERMALINK_RE.search(url)
     if match:
         return match.group(4)
     
     # Try simpler pattern: /slug/
-    match = re.search(r'/([^/]+)/?$', url)
+    match = _LAST_SEGMENT_RE.search(url)
     if match:
         return match.group(1)
     
@@ -69,7 +81,7 @@ def extract_date_from_url(url: str) -> Optional[datetime]:
     Returns:
         datetime object or None if not found
     """
-    match = re.search(r'/(\d{4})/(\d{2})/(\d{2})/', url)
+    match = _URL_DATE_RE.search(url)
     if match:
         try:
             return datetime(
@@ -95,6 +107,20 @@ def parse_flexible_date(date_str: str) -> Optional[datetime]:
     if not date_str:
         return None
     
+    # Fast path for ISO timestamps, the common case; dateutil's fuzzy parser
+    # is far slower and yields the same result for these
+    match = _ISO_DATE_RE.fullmatch(date_str.strip())
+    if match:
+        year, month, day, hour, minute, second, fraction = match.groups()
+        try:
+            return datetime(
+                int(year), int(month), int(day),
+                int(hour or 0), int(minute or 0), int(second or 0),
+                int(fraction.ljust(6, '0')) if fraction else 0
+            )
+        except ValueError:
+            pass  # Out-of-range fields; let dateutil interpret them
+    
     try:
         dt = dateparser.parse(date_str, fuzzy=True)
         # Strip timezone for consistency
@@ -118,6 +144,78 @@ def compute_content_hash(content: str) -> str:
     return hashlib.sha1(content.encode('utf-8')).hexdigest()
 
 
+def _digest(text: str) -> bytes:
+    """Return the 16-byte BLAKE2b digest used for deduplication keys."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def compute_url_key(url: str) -> bytes:
+    """
+    Compute a compact fixed-size key for URL deduplication.
+    
+    A 16-byte BLAKE2b digest takes well under half the memory of a typical
+    URL string in a set, while keeping collisions negligible so no distinct
+    URL is ever dropped.
+    
+    Args:
+        url: URL to key, normalized by the caller if needed
+        
+    Returns:
+        16-byte digest
+    """
+    return _digest(url)
+
+
+def compute_content_key(content: str) -> bytes:
+    """
+    Compute a compact fixed-size key for content deduplication.
+    
+    Like compute_url_key, but for post bodies: a 16-byte BLAKE2b digest is
+    a fraction of the size of a hex digest string held in a set.
+    
+    Args:
+        content: Content string to key
+        
+    Returns:
+        16-byte digest
+    """
+    return _digest(content)
+
+
+def compute_simhash(content: str, shingle_size: int = 3) -> int:
+    """
+    Compute a 64-bit SimHash of content for near-duplicate detection.
+    
+    Each run of shingle_size words is hashed and votes on every bit; texts
+    differing only by a few words (timestamps, counters, leftover archive
+    banners) end up a few bits apart, while unrelated texts differ in
+    about half of them.
+    
+    Args:
+        content: Content string to fingerprint
+        shingle_size: Words per shingle
+        
+    Returns:
+        64-bit fingerprint as an int
+    """
+    words = content.lower().split()
+    shingles = [
+        ' '.join(words[i:i + shingle_size])
+        for i in range(max(len(words) - shingle_size + 1, 1))
+    ]
+    
+    # Count set bits per position column-wise over the binary strings,
+    # which keeps the per-bit loop in C
+    bits = [
+        format(int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big'), '064b')
+        for s in shingles
+    ]
+    fingerprint = 0
+    for column in zip(*bits):
+        fingerprint = (fingerprint << 1) | (column.count('1') * 2 > len(bits))
+    return fingerprint
+
+
 def strip_wayback_url(url: str) -> Tuple[Optional[str], Optional[str]]:
     """
     Extract original URL and timestamp from Wayback Machine URL.
@@ -175,6 +273,9 @@ def get_local_path_for_url(url: str, base_dir: Path) -> Path:
     """
     Generate a local file path for a given URL.
     
+    This is a pure path computation; callers create the parent directory
+    before writing.
+    
     Args:
         url: URL to generate path for
         base_dir: Base directory for storing files
@@ -190,13 +291,50 @@ def get_local_path_for_url(url: str, base_dir: Path) -> Path:
     # Decode URL encoding
     path = unquote(path)
     
-    # Construct full path
-    full_path = base_dir / parsed.netloc / path
+    # Host names are case-insensitive; fold them so every spelling of a
+    # host shares one directory
+    return base_dir / parsed.netloc.lower() / path
+
+
+# Path segments that rule a URL out as a post wherever they appear
+POST_REJECT_SEGMENTS = ('/category/', '/tag/', '/author/', '/search/')
+
+# Common non-post patterns, matched against a normalized URL
+_EXCLUDE_PATTERNS = [
+    r'/feed/?$',
+    r'/amp/?$',
+    r'/page/\d+/?$',
+    *(re.escape(segment) for segment in POST_REJECT_SEGMENTS),
+    r'/\d{4}/?$',  # Year only
+    r'/\d{4}/\d{2}/?$',  # Year/month only
+    r'/\d{4}/\d{2}/\d{2}/?$',  # Date only, no slug
+    r'\.(jpg|jpeg|png|gif|css|js|xml|json)$',  # Media files
+]
+
+# Post pattern: /YYYY/MM/DD/slug/ or /slug/ (the simple slug form covers both)
+_POST_PATTERN = r'/[^/]+/?$'
+
+
+@lru_cache(maxsize=None)
+def post_url_pattern(domain: str) -> Pattern[str]:
+    """
+    Build a single compiled pattern recognizing post URLs for a domain.
     
-    # Ensure parent directory
-    full_path.parent.mkdir(parents=True, exist_ok=True)
+    The pattern is matched against a normalized URL (see normalize_url) and
+    folds the domain check, every exclusion and the post shape into one
+    regex so each URL is scanned once. Patterns are cached per domain.
     
-    return full_path
+    Args:
+        domain: Site domain
+        
+    Returns:
+        Compiled pattern; use .match() on a normalized URL
+    """
+    exclude = '|'.join(f'(?:{p})' for p in _EXCLUDE_PATTERNS)
+    return re.compile(
+        rf'{re.escape(domain.replace("www.", ""))}(?!.*(?:{exclude})).*{_POST_PATTERN}',
+        re.DOTALL
+    )
 
 
 def is_post_url(url: str, domain: str) -> bool:
@@ -210,43 +348,7 @@ def is_post_url(url: str, domain: str) -> bool:
     Returns:
         True if URL appears to be a post
     """
-    # Normalize for comparison
-    normalized = normalize_url(url)
-    
-    # Must be from correct domain
-    if not normalized.startswith(domain.replace('www.', '')):
-        return False
-    
-    # Exclude common non-post patterns
-    exclude_patterns = [
-        r'/feed/?$',
-        r'/amp/?$',
-        r'/page/\d+/?$',
-        r'/category/',
-        r'/tag/',
-        r'/author/',
-        r'/search/',
-        r'/\d{4}/?$',  # Year only
-        r'/\d{4}/\d{2}/?$',  # Year/month only
-        r'/\d{4}/\d{2}/\d{2}/?$',  # Date only, no slug
-        r'\.(jpg|jpeg|png|gif|css|js|xml|json)$',  # Media files
-    ]
-    
-    for pattern in exclude_patterns:
-        if re.search(pattern, normalized):
-            return False
-    
-    # Must have post pattern: /YYYY/MM/DD/slug/ or /slug/
-    post_patterns = [
-        r'/\d{4}/\d{2}/\d{2}/[^/]+/?$',  # Date-based permalink
-        r'/[^/]+/?$',  # Simple slug
-    ]
-    
-    for pattern in post_patterns:
-        if re.search(pattern, normalized):
-            return True
-    
-    return False
+    return post_url_pattern(domain).match(normalize_url(url)) is not None
 
 
 def format_bytes(size: int) -> str:
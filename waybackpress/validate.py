@@ -10,17 +10,24 @@ Handles sporadic Wayback Machine archives by trying multiple sources:
 """
 
 import asyncio
+import codecs
 import csv
 import json
 import logging
+import os
 import re
+import sys
+import tempfile
 import warnings
+from collections import OrderedDict
+from html import unescape
 from pathlib import Path
 from typing import Optional, Dict, Any, List, Set, Tuple
 from datetime import datetime
+from urllib.parse import urlparse
 
 import aiohttp
-from bs4 import BeautifulSoup, Tag, XMLParsedAsHTMLWarning
+from bs4 import BeautifulSoup, SoupStrainer, Tag, XMLParsedAsHTMLWarning
 import trafilatura
 
 from .config import ProjectConfig
@@ -28,7 +35,8 @@ from .utils import (
     extract_date_from_url,
     extract_slug_from_url,
     parse_flexible_date,
-    compute_content_hash,
+    compute_content_key,
+    compute_simhash,
     get_local_path_for_url,
     construct_wayback_url,
     truncate_string,
@@ -37,6 +45,169 @@ from .utils import (
 
 logger = logging.getLogger('waybackpress.validate')
 
+# WordPress body class patterns
+_POSTID_CLASS_RE = re.compile(r'postid-(\d+)')
+_POST_CLASS_RE = re.compile(r'post-(\d+)')
+_PAGE_ID_CLASS_RE = re.compile(r'page-id-(\d+)')
+_CATEGORY_CLASS_RE = re.compile(r'category-(.+)')
+_TAG_CLASS_RE = re.compile(r'tag-(.+)')
+_AUTHOR_CLASS_RE = re.compile(r'author-(.+)')
+
+# Parts of a page the extractors read: <title> and <meta> from the head,
+# and the whole body. Head scripts and styles are never built into the soup
+_PAGE_STRAINER = SoupStrainer(['title', 'meta', 'body'])
+
+# Meta tag names/properties for a publish date ('pubdate' is covered by
+# 'date') or an author
+_META_DATE_RE = re.compile(r'date|published', re.IGNORECASE)
+_META_AUTHOR_RE = re.compile(r'author', re.IGNORECASE)
+
+# Wayback Machine toolbar elements, by ID or by class
+_WAYBACK_ID_RE = re.compile(r'wm-|wm_|donato|wayback', re.IGNORECASE)
+_WAYBACK_CLASS_RE = re.compile(r'wm-|wayback', re.IGNORECASE)
+
+# Body class substrings marking a page rather than a post
+_PAGE_INDICATORS = ('page-template', 'page-id-', 'single-page')
+
+# Category, tag, author, archive and date listing URLs
+_ARCHIVE_URL_RE = re.compile(r'/(category|tag|author|archive|page)/|/\d{4}/?$|/\d{4}/\d{2}/?$')
+
+# Validated URLs between progress updates, and between intermediate saves
+PROGRESS_INTERVAL = 10
+SAVE_INTERVAL = 50
+
+# Bytes per read when streaming a snapshot to disk
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Validation report columns (every result field except content)
+REPORT_FIELDS = [
+    'url', 'valid', 'reason', 'title', 'date', 'author',
+    'categories', 'tags', 'word_count', 'extraction_method', 'local_path'
+]
+
+# Maximum captures returned by one host-wide CDX prefetch query
+CDX_PREFETCH_LIMIT = 50000
+
+# Extractions kept for reuse by URLs whose snapshot HTML is identical
+EXTRACT_CACHE_SIZE = 1024
+
+# Content whose SimHash is within this many bits of a valid post's is a
+# near-duplicate. The 64-bit fingerprint is indexed in 16-bit bands: with
+# at most 3 differing bits, at least one of the 4 bands matches exactly
+SIMHASH_MAX_DISTANCE = 3
+SIMHASH_BANDS = 4
+SIMHASH_BAND_BITS = 64 // SIMHASH_BANDS
+
+
+def _rel(link: Tag) -> str:
+    """Return a link's rel attribute as one space-separated string."""
+    rel = link.get('rel', '')
+    return rel if isinstance(rel, str) else ' '.join(rel)
+
+
+def _classify_body(soup: BeautifulSoup) -> Dict[str, Any]:
+    """
+    Read post type, post ID and term metadata from WordPress body classes.
+    
+    Walks the class list once, so every body-class lookup for a page
+    shares a single scan.
+    
+    Returns dict with: post_type, post_id, categories, tags, author
+    """
+    info = {
+        'post_type': 'post',
+        'post_id': None,
+        'categories': [],
+        'tags': [],
+        'author': None
+    }
+    
+    body = soup.find('body')
+    if not body:
+        return info
+    
+    classes = body.get('class', [])
+    if isinstance(classes, str):
+        classes = classes.split()
+    
+    for cls in classes:
+        # Page indicators (substring match, e.g. page-template-default)
+        if any(indicator in cls for indicator in _PAGE_INDICATORS):
+            info['post_type'] = 'page'
+        
+        # First postid-XXX, post-XXX, or page-id-XXX wins
+        if info['post_id'] is None:
+            match = (
+                _POSTID_CLASS_RE.match(cls)
+                or _POST_CLASS_RE.match(cls)
+                or _PAGE_ID_CLASS_RE.match(cls)
+            )
+            if match:
+                info['post_id'] = int(match.group(1))
+        
+        # Extract categories
+        if match := _CATEGORY_CLASS_RE.match(cls):
+            cat = match.group(1).replace('-', ' ').title()
+            if cat not in info['categories']:
+                info['categories'].append(cat)
+        
+        # Extract tags
+        if match := _TAG_CLASS_RE.match(cls):
+            tag = match.group(1).replace('-', ' ').title()
+            if tag not in info['tags']:
+                info['tags'].append(tag)
+        
+        # Extract author
+        if match := _AUTHOR_CLASS_RE.match(cls):
+            info['author'] = match.group(1).replace('-', ' ').title()
+    
+    return info
+
+
+async def _lookup_snapshot(
+    session: aiohttp.ClientSession,
+    url: str,
+    snapshots: Dict[str, Optional[str]]
+) -> Optional[str]:
+    """
+    Find a Wayback Machine snapshot for a URL, memoized in snapshots.
+    
+    Answered lookups, including "no captures", are remembered in the map
+    alongside any prefetched ones; failed ones are not, so they are retried.
+    
+    Args:
+        session: aiohttp session for requests
+        url: URL to look up
+        snapshots: Map of URL to snapshot URL (or None) for the run
+        
+    Returns:
+        Wayback URL of the first capture, or None
+    """
+    if url in snapshots:
+        return snapshots[url]
+    
+    cdx_url = (
+        f"https://web.archive.org/cdx/search/cdx"
+        f"?url={url}"
+        f"&output=json"
+        f"&limit=1"
+    )
+    
+    try:
+        async with session.get(cdx_url, timeout=aiohttp.ClientTimeout(total=10)) as response:
+            if response.status == 200:
+                data = json.loads(await response.read())
+                snapshot = None
+                if len(data) > 1:  # First row is headers
+                    timestamp = data[1][1]
+                    snapshot = construct_wayback_url(url, timestamp)
+                snapshots[url] = snapshot
+                return snapshot
+    except Exception as e:
+        logger.debug(f"CDX query failed for {url}: {e}")
+    
+    return None
+
 
 class ContentExtractor:
     """
@@ -47,9 +218,15 @@ class ContentExtractor:
     have different formats available.
     """
     
-    def __init__(self, config: ProjectConfig):
+    def __init__(
+        self,
+        config: ProjectConfig,
+        snapshots: Optional[Dict[str, Optional[str]]] = None
+    ):
         self.config = config
         self.session: Optional[aiohttp.ClientSession] = None
+        # Shared with PostValidator so one map caches every CDX lookup
+        self.snapshots: Dict[str, Optional[str]] = {} if snapshots is None else snapshots
     
     async def extract_all(
         self, 
@@ -75,12 +252,16 @@ class ContentExtractor:
             'post_type': 'post'
         }
         
+        # Classify body classes once; post type, post ID (works for ALL WP
+        # themes) and term metadata all come from the same scan
+        body_info = _classify_body(soup)
+        
         # Detect post type (post or page)
-        post_type = self.detect_post_type(soup)
+        post_type = body_info['post_type']
         result['post_type'] = post_type
         
-        # Extract post ID from body classes (works for ALL WP themes)
-        post_id = self.extract_post_id(soup)
+        # Extract post ID from body classes
+        post_id = body_info['post_id']
         
         # Strategy 1: Try WordPress REST API (if post ID found)
         if post_id and self.session:
@@ -94,6 +275,34 @@ class ContentExtractor:
         # Note: This would require fetching /feed/ separately
         # Skipping for now as it requires additional HTTP requests
         
+        # The remaining strategies are CPU-bound; run them in the default
+        # thread pool so other in-flight requests keep being serviced
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self.extract_from_html, url, html, soup, result, body_info
+        )
+    
+    def extract_from_html(
+        self,
+        url: str,
+        html: str,
+        soup: BeautifulSoup,
+        result: Dict[str, Any],
+        body_info: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Run the HTML-based extraction strategies (trafilatura onwards).
+        
+        Args:
+            url: Original post URL
+            html: Raw page HTML
+            soup: Parsed page, Wayback chrome already stripped
+            result: Result dict from extract_all, updated in place
+            body_info: Body class classification for the page
+            
+        Returns:
+            The updated result dict
+        """
         # Strategy 3: Trafilatura (heuristic extraction - works on 80%+ of sites)
         logger.debug("Trying trafilatura extraction")
         if content := self.try_trafilatura(html):
@@ -105,8 +314,11 @@ class ContentExtractor:
         
         # Strategy 4: WordPress body class metadata extraction
         logger.debug("Extracting metadata from WordPress body classes")
-        wp_metadata = self.extract_wordpress_metadata(soup)
-        result.update(wp_metadata)
+        result.update(
+            categories=body_info['categories'],
+            tags=body_info['tags'],
+            author=body_info['author']
+        )
         
         # Strategy 5: Title extraction (multiple methods)
         if not result['title']:
@@ -135,24 +347,7 @@ class ContentExtractor:
         
         Example: <body class="postid-191 single-post">
         """
-        body = soup.find('body')
-        if not body:
-            return None
-        
-        classes = body.get('class', [])
-        if isinstance(classes, str):
-            classes = classes.split()
-        
-        for cls in classes:
-            # Look for postid-XXX, post-XXX, or page-id-XXX patterns
-            if match := re.match(r'postid-(\d+)', cls):
-                return int(match.group(1))
-            if match := re.match(r'post-(\d+)', cls):
-                return int(match.group(1))
-            if match := re.match(r'page-id-(\d+)', cls):
-                return int(match.group(1))
-        
-        return None
+        return _classify_body(soup)['post_id']
     
     def detect_post_type(self, soup: BeautifulSoup) -> str:
         """
@@ -160,22 +355,7 @@ class ContentExtractor:
         
         Returns: 'post' or 'page'
         """
-        body = soup.find('body')
-        if not body:
-            return 'post'
-        
-        classes = body.get('class', [])
-        if isinstance(classes, str):
-            classes = classes.split()
-        
-        # Check for page indicators
-        page_indicators = ['page-template', 'page-id-', 'page ', 'single-page']
-        for cls in classes:
-            for indicator in page_indicators:
-                if indicator in cls:
-                    return 'page'
-        
-        return 'post'
+        return _classify_body(soup)['post_type']
     
     async def try_wp_json(self, original_url: str, post_id: int, post_type: str = 'post') -> Optional[Dict]:
         """
@@ -189,7 +369,6 @@ class ContentExtractor:
             return None
         
         # Construct wp-json URL
-        from urllib.parse import urlparse
         parsed = urlparse(original_url)
         base_domain = f"{parsed.scheme}://{parsed.netloc}"
         
@@ -206,7 +385,7 @@ class ContentExtractor:
             await asyncio.sleep(self.config.delay)
             async with self.session.get(wayback_json, timeout=aiohttp.ClientTimeout(total=30)) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = json.loads(await response.read())
                     logger.info(f"Successfully extracted from wp-json API")
                     return data
         except Exception as e:
@@ -215,43 +394,24 @@ class ContentExtractor:
         return None
     
     async def find_snapshot(self, url: str) -> Optional[str]:
-        """Find a Wayback Machine snapshot for a URL."""
+        """Find a Wayback Machine snapshot for a URL (see _lookup_snapshot)."""
         if not self.session:
             return None
-        
-        cdx_url = (
-            f"https://web.archive.org/cdx/search/cdx"
-            f"?url={url}"
-            f"&output=json"
-            f"&limit=1"
-        )
-        
-        try:
-            async with self.session.get(cdx_url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if len(data) > 1:  # First row is headers
-                        timestamp = data[1][1]
-                        return construct_wayback_url(url, timestamp)
-        except Exception as e:
-            logger.debug(f"CDX query failed for {url}: {e}")
-        
-        return None
+        return await _lookup_snapshot(self.session, url, self.snapshots)
     
     def parse_wp_json(self, data: Dict) -> Dict[str, Any]:
         """
         Parse WordPress REST API JSON response.
         This gives us CLEAN content without theme chrome.
         """
-        from html import unescape
-        
         # Extract rendered HTML content
         content_html = data.get('content', {}).get('rendered', '')
         
         # Clean HTML to text
         if content_html:
-            # Use trafilatura to clean the HTML
-            content = trafilatura.extract(content_html, output_format='txt')
+            # The rendered content is already just the post body, so a plain
+            # text dump is enough; trafilatura's scoring would only cost time
+            content = BeautifulSoup(content_html, 'lxml').get_text(separator='\n', strip=True)
         else:
             content = ''
         
@@ -314,38 +474,12 @@ class ContentExtractor:
         - single-post / page
         - author-john-doe
         """
-        result = {
-            'categories': [],
-            'tags': [],
-            'author': None
+        info = _classify_body(soup)
+        return {
+            'categories': info['categories'],
+            'tags': info['tags'],
+            'author': info['author']
         }
-        
-        body = soup.find('body')
-        if not body:
-            return result
-        
-        classes = body.get('class', [])
-        if isinstance(classes, str):
-            classes = classes.split()
-        
-        for cls in classes:
-            # Extract categories
-            if match := re.match(r'category-(.+)', cls):
-                cat = match.group(1).replace('-', ' ').title()
-                if cat not in result['categories']:
-                    result['categories'].append(cat)
-            
-            # Extract tags
-            if match := re.match(r'tag-(.+)', cls):
-                tag = match.group(1).replace('-', ' ').title()
-                if tag not in result['tags']:
-                    result['tags'].append(tag)
-            
-            # Extract author
-            if match := re.match(r'author-(.+)', cls):
-                result['author'] = match.group(1).replace('-', ' ').title()
-        
-        return result
     
     def extract_title(self, soup: BeautifulSoup) -> Optional[str]:
         """Extract post title using multiple strategies."""
@@ -386,10 +520,10 @@ class ContentExtractor:
         
         # Strategy 2: Meta tags
         for meta in soup.find_all('meta'):
-            name = meta.get('name', '').lower()
-            prop = meta.get('property', '').lower()
+            name = meta.get('name', '')
+            prop = meta.get('property', '')
             
-            if any(x in name or x in prop for x in ['date', 'published', 'pubdate']):
+            if _META_DATE_RE.search(name) or _META_DATE_RE.search(prop):
                 if content := meta.get('content'):
                     if date := parse_flexible_date(content):
                         return date
@@ -408,20 +542,23 @@ class ContentExtractor:
     def extract_author(self, soup: BeautifulSoup) -> Optional[str]:
         """Extract author using multiple strategies."""
         # Strategy 1: Meta tags
-        for meta in soup.find_all('meta'):
-            name = meta.get('name', '').lower()
-            if 'author' in name:
-                if content := meta.get('content'):
-                    return content.strip()
+        for meta in soup.find_all('meta', attrs={'name': _META_AUTHOR_RE}):
+            if content := meta.get('content'):
+                return content.strip()
         
-        # Strategy 2: WordPress author links
-        for link in soup.select('a[rel="author"], .author a, .by-author a'):
+        # Strategy 2: WordPress author links (rel="author", or inside a
+        # .author / .by-author byline), in document order
+        bylines = soup.find_all(class_=['author', 'by-author'])
+        byline_links = {id(link) for byline in bylines for link in byline.find_all('a')}
+        for link in soup.find_all('a'):
+            if _rel(link) != 'author' and id(link) not in byline_links:
+                continue
             author = link.get_text(strip=True)
             if author and len(author) < 100:
                 return author
         
         # Strategy 3: <span class="author">
-        for elem in soup.select('.author, .post-author, .entry-author'):
+        for elem in soup.find_all(class_=['author', 'post-author', 'entry-author']):
             author = elem.get_text(strip=True)
             if author and len(author) < 100:
                 return author
@@ -433,13 +570,15 @@ class ContentExtractor:
         categories = []
         
         # Strategy 1: WordPress category links
-        for link in soup.select('a[rel="category"], a[rel="category tag"]'):
+        for link in soup.find_all('a', rel=True):
+            if _rel(link) not in ('category', 'category tag'):
+                continue
             cat = link.get_text(strip=True)
             if cat and cat not in categories:
                 categories.append(cat)
         
         # Strategy 2: Common category containers
-        for container in soup.select('.categories, .category, .post-categories'):
+        for container in soup.find_all(class_=['categories', 'category', 'post-categories']):
             for link in container.find_all('a'):
                 cat = link.get_text(strip=True)
                 if cat and cat not in categories and len(cat) < 50:
@@ -452,13 +591,15 @@ class ContentExtractor:
         tags = []
         
         # Strategy 1: WordPress tag links
-        for link in soup.select('a[rel="tag"]'):
+        for link in soup.find_all('a', rel=True):
+            if _rel(link) != 'tag':
+                continue
             tag = link.get_text(strip=True)
             if tag and tag not in tags:
                 tags.append(tag)
         
         # Strategy 2: Common tag containers
-        for container in soup.select('.tags, .post-tags, .tag-links'):
+        for container in soup.find_all(class_=['tags', 'post-tags', 'tag-links']):
             for link in container.find_all('a'):
                 tag = link.get_text(strip=True)
                 if tag and tag not in tags and len(tag) < 50:
@@ -472,14 +613,21 @@ class PostValidator:
     
     def __init__(self, config: ProjectConfig):
         self.config = config
-        self.seen_hashes: Set[str] = set()
+        self.paths = config.get_paths()
+        self.seen_hashes: Set[bytes] = set()
+        self.simhash_bands: List[Dict[int, List[int]]] = [{} for _ in range(SIMHASH_BANDS)]
         self.seen_titles: Set[str] = set()
         self.results: List[Dict[str, Any]] = []
-        self.extractor = ContentExtractor(config)
+        self.saved_count = 0
+        self.valid_count = 0
+        self.snapshots: Dict[str, Optional[str]] = {}
+        self.downloads: Dict[Path, asyncio.Future] = {}
+        self.extract_cache: 'OrderedDict[Tuple, Dict[str, Any]]' = OrderedDict()
+        self.extractor = ContentExtractor(config, self.snapshots)
     
     def load_discovered_urls(self) -> List[str]:
         """Load URLs from discovery phase."""
-        urls_file = self.config.get_paths()['discovered_urls']
+        urls_file = self.paths['discovered_urls']
         
         if not urls_file.exists():
             raise FileNotFoundError(
@@ -491,26 +639,104 @@ class PostValidator:
             next(f)
             return [line.strip() for line in f if line.strip()]
     
-    async def find_snapshot(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
-        """Find a Wayback Machine snapshot for a URL."""
+    def get_html_path(self, url: str) -> Path:
+        """Local path the snapshot HTML for a URL is stored at."""
+        slug = extract_slug_from_url(url) or 'unknown'
+        return self.paths['html'] / f"{slug}.html"
+    
+    async def prefetch_snapshots(
+        self,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        urls: List[str]
+    ) -> None:
+        """
+        Look up snapshots for whole hosts up front.
+        
+        Posts live on one or a few hosts, so each host holding several URLs
+        to download is queried once with a CDX prefix match instead of once
+        per URL. Hits are stored in self.snapshots; anything not found falls
+        back to a per-URL query in find_snapshot.
+        
+        Args:
+            session: aiohttp session
+            semaphore: Concurrency limiter shared with the downloads
+            urls: URLs whose HTML still has to be downloaded
+        """
+        groups: Dict[str, List[str]] = {}
+        for url in urls:
+            host = urlparse(url).netloc.lower()
+            if host.startswith('www.'):
+                host = host[4:]
+            groups.setdefault(host, []).append(url)
+        
+        hosts = {host: members for host, members in groups.items() if len(members) > 1}
+        if not hosts:
+            return
+        
+        logger.info(f"Prefetching snapshots for {len(hosts)} hosts")
+        
+        await asyncio.gather(*[
+            self._prefetch_host(session, semaphore, host, members)
+            for host, members in hosts.items()
+        ])
+        
+        logger.info(f"Prefetched snapshots for {len(self.snapshots)} URLs")
+    
+    async def _prefetch_host(
+        self,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        host: str,
+        members: List[str]
+    ) -> None:
+        """Query one host prefix and cache the first snapshot of its members."""
+        # collapse=original keeps one row per run of identical URLs; rows
+        # are sorted by URL key then timestamp, so the first row of each key
+        # is its earliest capture, as returned by a per-URL limit=1 query
         cdx_url = (
             f"https://web.archive.org/cdx/search/cdx"
-            f"?url={url}"
+            f"?url={host}/"
+            f"&matchType=prefix"
             f"&output=json"
-            f"&limit=1"
+            f"&fl=urlkey,timestamp,original"
+            f"&collapse=original"
+            f"&limit={CDX_PREFETCH_LIMIT}"
         )
         
         try:
-            async with session.get(cdx_url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if len(data) > 1:  # First row is headers
-                        timestamp = data[1][1]
-                        return construct_wayback_url(url, timestamp)
+            async with semaphore:
+                async with session.get(cdx_url, timeout=aiohttp.ClientTimeout(total=60)) as response:
+                    if response.status != 200:
+                        return
+                    
+                    data = json.loads(await response.read())
         except Exception as e:
-            logger.debug(f"CDX query failed for {url}: {e}")
-        
-        return None
+            logger.debug(f"CDX prefix query failed for {host}: {e}")
+            return
+        
+        rows = data[1:]  # Skip header
+        if not rows:
+            return
+        
+        first_timestamps: Dict[str, str] = {}
+        keys: Dict[str, str] = {}
+        for urlkey, timestamp, original in rows:
+            first_timestamps.setdefault(urlkey, timestamp)
+            keys.setdefault(original, urlkey)
+        
+        # A truncated response may have cut off the last URL's captures
+        if len(rows) >= CDX_PREFETCH_LIMIT:
+            del first_timestamps[rows[-1][0]]
+        
+        for url in members:
+            timestamp = first_timestamps.get(keys.get(url))
+            if timestamp:
+                self.snapshots[url] = construct_wayback_url(url, timestamp)
+    
+    async def find_snapshot(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
+        """Find a Wayback Machine snapshot for a URL (see _lookup_snapshot)."""
+        return await _lookup_snapshot(session, url, self.snapshots)
     
     async def download_html(
         self,
@@ -529,12 +755,16 @@ class PostValidator:
             
             async with session.get(wayback_url, timeout=aiohttp.ClientTimeout(total=30)) as response:
                 if response.status == 200:
-                    html = await response.text()
-                    
-                    # Save HTML
-                    local_path.parent.mkdir(parents=True, exist_ok=True)
-                    with open(local_path, 'w', encoding='utf-8') as f:
-                        f.write(html)
+                    # HTML is stored as UTF-8; pages already in it are
+                    # streamed to disk as is, others are decoded and re-encoded
+                    if (response.charset or '').lower() in ('utf-8', 'utf8'):
+                        await self.stream_html(response, local_path)
+                    else:
+                        html = await response.text()
+                        
+                        # Save HTML without blocking the event loop
+                        loop = asyncio.get_running_loop()
+                        await loop.run_in_executor(None, self.save_html, local_path, html)
                     
                     return True
                 else:
@@ -544,35 +774,112 @@ class PostValidator:
         
         return False
     
+    async def stream_html(self, response: aiohttp.ClientResponse, local_path: Path) -> None:
+        """
+        Stream a UTF-8 HTML response to disk without buffering it whole.
+        
+        The bytes are written to a uniquely named partial file beside the
+        target, so an interrupted download never leaves a file that a later
+        run would treat as downloaded, and concurrent downloads of the same
+        path never write into each other. They are still run through an
+        incremental decoder, so invalid UTF-8 fails the download just as
+        response.text() would. Writes go through the default thread pool so
+        slow disks never stall the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        part = tempfile.NamedTemporaryFile(
+            dir=local_path.parent,
+            prefix=local_path.name + '.',
+            suffix='.part',
+            delete=False,
+        )
+        try:
+            with part as f:
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    decoder.decode(chunk)
+                    await loop.run_in_executor(None, f.write, chunk)
+            decoder.decode(b'', final=True)
+            os.replace(part.name, local_path)
+        except BaseException:
+            if os.path.exists(part.name):
+                os.unlink(part.name)
+            raise
+    
+    def save_html(self, local_path: Path, html: str) -> None:
+        """
+        Write downloaded HTML to disk, creating its directory.
+        
+        The file is written beside the target under a unique name and then
+        moved into place, so it never exists half-written.
+        """
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+        part = tempfile.NamedTemporaryFile(
+            'w',
+            encoding='utf-8',
+            dir=local_path.parent,
+            prefix=local_path.name + '.',
+            suffix='.part',
+            delete=False,
+        )
+        try:
+            with part as f:
+                f.write(html)
+            os.replace(part.name, local_path)
+        except BaseException:
+            if os.path.exists(part.name):
+                os.unlink(part.name)
+            raise
+    
+    def read_html(self, local_path: Path) -> str:
+        """Read stored HTML from disk."""
+        with open(local_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def parse_html(self, html: str) -> BeautifulSoup:
+        """
+        Parse snapshot HTML and strip the Wayback chrome.
+        
+        Runs in a worker thread. XMLParsedAsHTMLWarning is silenced by the
+        async callers, since warning filters are process-wide and cannot be
+        scoped to a single thread.
+        """
+        soup = BeautifulSoup(html, 'lxml', parse_only=_PAGE_STRAINER)
+        return self.strip_wayback_chrome(soup)
+    
     def strip_wayback_chrome(self, soup: BeautifulSoup) -> BeautifulSoup:
         """Remove Wayback Machine UI elements."""
         # Collect elements to remove
         to_remove = []
         
-        # Wayback toolbar and scripts
-        for tag in soup.find_all():
-            if not tag.name:
+        # Wayback toolbar and scripts; most tags carry no attributes at all,
+        # so the attribute dict is checked directly
+        for tag in soup.find_all(True):
+            attrs = tag.attrs
+            if not attrs:
                 continue
             
             # Check ID
-            tag_id = tag.get('id', '')
-            if isinstance(tag_id, list):
-                tag_id = ' '.join(tag_id)
-            if any(x in tag_id.lower() for x in ['wm-', 'donato', 'wm_', 'wayback']):
-                to_remove.append(tag)
-                continue
+            if tag_id := attrs.get('id'):
+                if isinstance(tag_id, list):
+                    tag_id = ' '.join(tag_id)
+                if _WAYBACK_ID_RE.search(tag_id):
+                    to_remove.append(tag)
+                    continue
             
             # Check class
-            tag_class = tag.get('class', [])
-            if isinstance(tag_class, str):
-                tag_class = [tag_class]
-            if any(any(x in c.lower() for x in ['wm-', 'wayback']) for c in tag_class):
-                to_remove.append(tag)
-                continue
+            if tag_class := attrs.get('class'):
+                if isinstance(tag_class, list):
+                    tag_class = ' '.join(tag_class)
+                if _WAYBACK_CLASS_RE.search(tag_class):
+                    to_remove.append(tag)
+                    continue
             
             # Remove Wayback scripts
             if tag.name == 'script':
-                src = tag.get('src', '')
+                src = attrs.get('src', '')
                 if 'archive.org' in src or 'wombat' in src.lower():
                     to_remove.append(tag)
         
@@ -589,7 +896,18 @@ class PostValidator:
         url: str
     ) -> Dict[str, Any]:
         """Validate a single URL and extract metadata."""
-        result = {
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', category=XMLParsedAsHTMLWarning)
+            result = await self.fetch_and_extract(session, url)
+        if result['reason']:
+            return result
+        
+        # Apply heuristics
+        return self.apply_heuristics(result)
+    
+    def new_result(self, url: str) -> Dict[str, Any]:
+        """Return an empty, not yet validated result for a URL."""
+        return {
             'url': url,
             'valid': False,
             'reason': '',
@@ -603,55 +921,136 @@ class PostValidator:
             'extraction_method': 'none',
             'post_type': 'post'
         }
+    
+    async def ensure_html(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        local_path: Path
+    ) -> Optional[str]:
+        """
+        Make sure a URL's snapshot HTML is on disk, downloading it if needed.
         
-        # Check if HTML already exists
-        slug = extract_slug_from_url(url) or 'unknown'
-        local_path = self.config.get_paths()['html'] / f"{slug}.html"
+        URLs sharing a slug share a local path. Only one of them downloads
+        at a time; the others wait for it and then reuse the file, or try
+        their own snapshot if that download failed, just as they would
+        have when URLs were validated one after another.
+        
+        Returns:
+            None once the file exists, otherwise the failure reason
+        """
+        while (pending := self.downloads.get(local_path)) is not None:
+            await asyncio.shield(pending)
+        
+        if local_path.exists():
+            return None
         
-        if not local_path.exists():
+        future = asyncio.get_running_loop().create_future()
+        self.downloads[local_path] = future
+        try:
             # Find snapshot only if we need to download
             wayback_url = await self.find_snapshot(session, url)
             if not wayback_url:
-                result['reason'] = 'no_snapshot'
-                return result
+                return 'no_snapshot'
             
-            # Download HTML
-            downloaded = await self.download_html(session, wayback_url, local_path)
-        else:
-            # File already exists, skip download
-            downloaded = True
+            if not await self.download_html(session, wayback_url, local_path):
+                return 'download_failed'
+            
+            return None
+        finally:
+            del self.downloads[local_path]
+            future.set_result(None)
+    
+    async def fetch_and_extract(
+        self,
+        session: aiohttp.ClientSession,
+        url: str
+    ) -> Dict[str, Any]:
+        """
+        Download a URL's snapshot if needed and extract its metadata.
+        
+        This is everything in validate_url except the heuristics, which
+        depend on previously validated posts and so must run in input order.
+        
+        Returns:
+            Result dict; 'reason' is already set if the URL failed here
+        """
+        result = self.new_result(url)
         
-        if not downloaded:
-            result['reason'] = 'download_failed'
+        local_path = self.get_html_path(url)
+        reason = await self.ensure_html(session, url, local_path)
+        if reason:
+            result['reason'] = reason
             return result
         
-        # Read and parse HTML
+        # Read and parse HTML; disk I/O and parsing run in the default
+        # thread pool so other in-flight requests keep being serviced
+        loop = asyncio.get_running_loop()
         try:
-            with open(local_path, 'r', encoding='utf-8') as f:
-                html = f.read()
+            html = await loop.run_in_executor(None, self.read_html, local_path)
         except Exception as e:
             logger.debug(f"Failed to read {local_path}: {e}")
             result['reason'] = 'read_failed'
             return result
         
-        # Parse HTML
-        with warnings.catch_warnings():
-            warnings.filterwarnings('ignore', category=XMLParsedAsHTMLWarning)
-            soup = BeautifulSoup(html, 'lxml')
-        
-        # Strip Wayback chrome
-        soup = self.strip_wayback_chrome(soup)
+        # URL variants sharing a slug share a snapshot; extraction also
+        # depends on the URL's host (wp-json) and date, so those are keyed too
+        parsed = urlparse(url)
+        cache_key = (
+            compute_content_key(html),
+            f"{parsed.scheme}://{parsed.netloc}",
+            extract_date_from_url(url),
+        )
         
-        # Extract content and metadata using multi-strategy approach
-        self.extractor.session = session
-        extracted = await self.extractor.extract_all(url, html, soup)
+        if (extracted := self.extract_cache.get(cache_key)) is not None:
+            self.extract_cache.move_to_end(cache_key)
+        else:
+            # Parse HTML and strip Wayback chrome
+            soup = await loop.run_in_executor(None, self.parse_html, html)
+            
+            # Extract content and metadata using multi-strategy approach
+            self.extractor.session = session
+            extracted = await self.extractor.extract_all(url, html, soup)
+            
+            self.extract_cache[cache_key] = extracted
+            if len(self.extract_cache) > EXTRACT_CACHE_SIZE:
+                self.extract_cache.popitem(last=False)
         
-        # Update result with extracted data
+        # Update result with extracted data (term lists are copied so
+        # results sharing a cached extraction stay independent)
         result.update(extracted)
+        result['categories'] = list(extracted['categories'])
+        result['tags'] = list(extracted['tags'])
         result['local_path'] = str(local_path)
         
-        # Apply heuristics
-        return self.apply_heuristics(result)
+        return result
+    
+    async def _bounded_fetch_and_extract(
+        self,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        url: str
+    ) -> Dict[str, Any]:
+        """Fetch and extract a single URL while holding a concurrency slot."""
+        async with semaphore:
+            logger.debug(f"Validating: {url}")
+            return await self.fetch_and_extract(session, url)
+    
+    def _prefilter(self, urls: List[str]) -> Tuple[List[str], Set[str]]:
+        """
+        Split off category, tag, author, archive and date listing URLs.
+        
+        Returns:
+            Tuple of (URLs to download, set of archive page URLs)
+        """
+        downloadable = []
+        archive_pages = set()
+        for url in urls:
+            if _ARCHIVE_URL_RE.search(url):
+                archive_pages.add(url)
+            else:
+                downloadable.append(url)
+        return downloadable, archive_pages
     
     def apply_heuristics(self, result: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -662,7 +1061,7 @@ class PostValidator:
         """
         # Check for archive-looking URLs (these are category/tag pages, not posts)
         url = result['url']
-        if re.search(r'/(category|tag|author|archive|page)/|/\d{4}/?$|/\d{4}/\d{2}/?$', url):
+        if _ARCHIVE_URL_RE.search(url):
             result['reason'] = 'archive_page'
             return result
         
@@ -673,11 +1072,18 @@ class PostValidator:
         
         # Check for duplicates by content hash (technical deduplication)
         content = result['content']
-        content_hash = compute_content_hash(content)
+        content_hash = compute_content_key(content)
         if content_hash in self.seen_hashes:
             result['reason'] = 'duplicate_content'
             return result
         
+        # Near-duplicates differ only by a few words (timestamps, counters,
+        # leftover archive banners)
+        simhash = compute_simhash(content)
+        if self.is_near_duplicate(simhash):
+            result['reason'] = 'duplicate_content'
+            return result
+        
         # Valid post! Extract everything, even if:
         # - No title (some posts are titleless)
         # - Short content (could be image post, quote, announcement)
@@ -685,47 +1091,73 @@ class PostValidator:
         result['valid'] = True
         result['reason'] = 'ok'
         self.seen_hashes.add(content_hash)
+        for band, index in enumerate(self.simhash_bands):
+            index.setdefault(self._simhash_band(simhash, band), []).append(simhash)
         
         return result
     
+    @staticmethod
+    def _simhash_band(simhash: int, band: int) -> int:
+        """Return one band of bits from a 64-bit SimHash."""
+        return (simhash >> (band * SIMHASH_BAND_BITS)) & ((1 << SIMHASH_BAND_BITS) - 1)
+    
+    def is_near_duplicate(self, simhash: int) -> bool:
+        """Check a SimHash against the fingerprints of valid posts so far."""
+        for band, index in enumerate(self.simhash_bands):
+            for seen in index.get(self._simhash_band(simhash, band), ()):
+                if bin(simhash ^ seen).count('1') <= SIMHASH_MAX_DISTANCE:
+                    return True
+        return False
+    
     def save_results(self) -> int:
-        """Save validation results to CSV and TSV files."""
-        paths = self.config.get_paths()
+        """
+        Save validation results to CSV and TSV files.
         
-        # Save validation report (CSV with all fields except content)
-        report_path = paths['validation_report']
+        Results are final once appended, so each call only appends those
+        added since the previous call; the first call starts both files
+        afresh.
+        
+        Returns:
+            Number of valid posts saved so far
+        """
+        new_results = self.results[self.saved_count:]
+        mode = 'a' if self.saved_count else 'w'
         
-        fieldnames = [
-            'url', 'valid', 'reason', 'title', 'date', 'author',
-            'categories', 'tags', 'word_count', 'extraction_method', 'local_path'
-        ]
+        # Save validation report (CSV with all fields except content)
+        report_path = self.paths['validation_report']
         
-        with open(report_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
+        with open(report_path, mode, newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if mode == 'w':
+                writer.writerow(REPORT_FIELDS)
             
-            for result in self.results:
-                row = {k: result.get(k, '') for k in fieldnames}
-                # Convert lists to strings
-                row['categories'] = ','.join(row['categories']) if row['categories'] else ''
-                row['tags'] = ','.join(row['tags']) if row['tags'] else ''
-                writer.writerow(row)
+            for result in new_results:
+                row = (result.get(k, '') for k in REPORT_FIELDS)
+                # Convert lists (categories, tags) to strings
+                writer.writerow([
+                    ','.join(value) if isinstance(value, list) else value
+                    for value in row
+                ])
         
         logger.info(f"Saved validation report to {report_path}")
         
         # Save valid posts (TSV)
-        valid_posts = [r for r in self.results if r['valid']]
-        valid_posts_path = paths['valid_posts']
+        valid_posts = [r for r in new_results if r['valid']]
+        valid_posts_path = self.paths['valid_posts']
         
-        with open(valid_posts_path, 'w') as f:
-            f.write("url\tlocal_path\tpost_type\n")
+        with open(valid_posts_path, mode) as f:
+            if mode == 'w':
+                f.write("url\tlocal_path\tpost_type\n")
             for result in valid_posts:
                 post_type = result.get('post_type', 'post')
                 f.write(f"{result['url']}\t{result['local_path']}\t{post_type}\n")
         
-        logger.info(f"Saved {len(valid_posts)} valid posts to {valid_posts_path}")
+        self.saved_count = len(self.results)
+        self.valid_count += len(valid_posts)
+        
+        logger.info(f"Saved {self.valid_count} valid posts to {valid_posts_path}")
         
-        return len(valid_posts)
+        return self.valid_count
     
     async def validate_all(self) -> int:
         """Main validation process."""
@@ -734,23 +1166,68 @@ class PostValidator:
         logger.info(f"Starting validation of {len(urls)} URLs")
         logger.info(f"Using delay of {self.config.delay}s between requests")
         
-        async with aiohttp.ClientSession(
-            headers={'User-Agent': self.config.user_agent}
-        ) as session:
-            # Process URLs (currently sequential, TODO: make concurrent)
-            for i, url in enumerate(urls, 1):
-                if i % 10 == 0:
-                    logger.info(f"Progress: {i}/{len(urls)} ({i/len(urls)*100:.1f}%)")
-                    import sys
-                    sys.stdout.flush()
+        semaphore = asyncio.Semaphore(self.config.concurrency)
+        # Idle connections outlive the per-request delay and the pauses while
+        # pages are parsed, so Wayback connections are reused, not renegotiated
+        connector = aiohttp.TCPConnector(
+            limit_per_host=self.config.concurrency,
+            keepalive_timeout=75,
+            ttl_dns_cache=300,
+        )
+        
+        # Parsing runs in worker threads, so the warning filter is set for
+        # the whole run rather than per parse
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', category=XMLParsedAsHTMLWarning)
+            
+            async with aiohttp.ClientSession(
+                headers={'User-Agent': self.config.user_agent},
+                connector=connector,
+            ) as session:
+                # Archive listings are rejected on their URL alone, before any
+                # snapshot lookup or download
+                downloadable, archive_pages = self._prefilter(urls)
+                
+                # Look up snapshots per host for everything not yet downloaded
+                await self.prefetch_snapshots(
+                    session,
+                    semaphore,
+                    [url for url in downloadable if not self.get_html_path(url).exists()]
+                )
                 
-                logger.debug(f"Validating: {url}")
-                result = await self.validate_url(session, url)
-                self.results.append(result)
+                # Downloads and extraction run concurrently, bounded by the
+                # configured concurrency; results are consumed in input order so
+                # duplicate detection and the saved reports stay deterministic
+                tasks = [
+                    None if url in archive_pages else
+                    asyncio.ensure_future(self._bounded_fetch_and_extract(session, semaphore, url))
+                    for url in urls
+                ]
                 
-                # Save intermediate results every 50 URLs
-                if i % 50 == 0:
-                    self.save_results()
+                try:
+                    for i, (url, task) in enumerate(zip(urls, tasks), 1):
+                        if task is None:
+                            result = self.new_result(url)
+                            result['reason'] = 'archive_page'
+                        else:
+                            result = await task
+                            if not result['reason']:
+                                result = self.apply_heuristics(result)
+                        self.results.append(result)
+                        
+                        if i % PROGRESS_INTERVAL == 0:
+                            logger.info(f"Progress: {i}/{len(urls)} ({i/len(urls)*100:.1f}%)")
+                            sys.stdout.flush()
+                        
+                        # Save intermediate results
+                        if i % SAVE_INTERVAL == 0:
+                            self.save_results()
+                finally:
+                    # A failed task or interruption must not leave the rest
+                    # downloading in the background; finished ones are unaffected
+                    for task in tasks:
+                        if task is not None:
+                            task.cancel()
         
         # Final save
         valid_count = self.save_results()